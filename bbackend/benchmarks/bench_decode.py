@@ -0,0 +1,79 @@
+"""
+Microbenchmark of decoding a messages API response into cache records.
+
+Compares the former path, json.loads followed by building every Message by hand,
+with the bulk TypeAdapter decode used by the upstream client.
+
+Run from the bbackend directory: poetry run python -m benchmarks.bench_decode
+"""
+
+import argparse
+import json
+import timeit
+from datetime import datetime, timedelta, timezone
+
+from src.dtos import Message
+from src.tools.cache_index import CachedMessage
+from src.tools.upstream_client import decode_messages, parse_messages
+
+
+def make_payload(count: int) -> bytes:
+    start = datetime(2025, 4, 1, tzinfo=timezone.utc)
+    return json.dumps(
+        [
+            {
+                "id": str(i),
+                "username": f"User{i % 40}",
+                "message": f"Message number {i} with some typical chat content",
+                "images": (
+                    [{"url": f"https://cdn.example.com/{i}.png", "extension": "png"}]
+                    if i % 10 == 0
+                    else []
+                ),
+                "createdAt": (start + timedelta(seconds=i)).isoformat(
+                    timespec="milliseconds"
+                ),
+            }
+            for i in range(count)
+        ]
+    ).encode()
+
+
+def decode_per_object(raw: bytes) -> list[CachedMessage]:
+    """The former path: decode, build each Message with keyword arguments, convert."""
+    messages = [
+        Message(
+            id=msg.get("id"),
+            username=msg["username"],
+            message=msg["message"],
+            images=msg["images"],
+            createdAt=msg["createdAt"],
+        )
+        for msg in json.loads(raw)
+    ]
+    return [CachedMessage.from_message(msg) for msg in messages]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    raw = make_payload(args.messages)
+    candidates = {
+        "json.loads + Message(...) per object": lambda: decode_per_object(raw),
+        "json.loads + bulk validate_python": lambda: parse_messages(json.loads(raw)),
+        "bulk validate_json on raw bytes": lambda: decode_messages(raw),
+    }
+
+    print(f"{args.messages} messages, {len(raw) / 1024:.0f} KiB, best of {args.repeat}")
+    baseline = None
+    for name, run in candidates.items():
+        seconds = min(timeit.repeat(run, number=1, repeat=args.repeat))
+        baseline = baseline or seconds
+        print(f"{name:40} {seconds * 1000:8.1f} ms  {baseline / seconds:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
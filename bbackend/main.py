@@ -1,19 +1,104 @@
 from src.tools.read_through_cache import ReadThroughCache
-from fastapi import FastAPI, HTTPException, Request
+from src.tools.cache_storage import SQLiteCacheStorage
+from src.tools.upstream_client import UpstreamClient
+from src.tools.prefetch_scheduler import PrefetchScheduler
+from src.tools.summary_cache import SummaryCache
+from src.tools.daily_digest import DailyDigests
+from contextlib import asynccontextmanager
+import asyncio
+import json
+import zlib
+from typing import AsyncIterator, Optional
+from src.const import BBACKEND_DIR
+from fastapi import FastAPI, HTTPException, Query, Request
 from src.agent import OrchestratorAgent
-from src.dtos import SummaryRequest
+from src.dtos import BatchSummaryRequest, SummaryRequest
 from dotenv import load_dotenv
 from loguru import logger
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
-from src.memory import MessageMemory
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from src.memory import MessageMemory, ThreadHistory, ThreadUpdate
+from src.config_loader import load_config
 
 load_dotenv()
-app = FastAPI(title="Podsumowywator Hackathon Bbackend API")
 
-cache = ReadThroughCache()
+config = load_config()
+MessageMemory.configure(
+    ttl_seconds=config.memory_ttl_seconds, max_entries=config.memory_max_entries
+)
+upstream_client = UpstreamClient(config)
+cache = ReadThroughCache(
+    max_bytes=config.cache_max_bytes,
+    max_bytes_per_channel=config.cache_max_bytes_per_channel,
+    storage=(
+        SQLiteCacheStorage(
+            BBACKEND_DIR / config.cache_db_path,
+            shared=config.cache_shared,
+            retention_days=config.cache_retention_days,
+        )
+        if config.cache_db_path
+        else None
+    ),
+    client=upstream_client,
+    max_concurrent_fetches=config.upstream_max_concurrent_fetches,
+    live_edge_ttl_seconds=config.cache_live_edge_ttl_seconds,
+    fetch_lease_seconds=config.timeout_seconds,
+)
 
-orchestrator_agent = OrchestratorAgent(cache)
+prefetch_scheduler = PrefetchScheduler(
+    cache,
+    interval_seconds=config.prefetch_interval_seconds,
+    max_channels=config.prefetch_max_channels,
+    max_concurrency=config.prefetch_max_concurrency,
+    lookback_days=config.prefetch_lookback_days,
+    quiet_hours=(
+        tuple(config.prefetch_quiet_hours) if config.prefetch_quiet_hours else None
+    ),
+)
+
+thread_history = ThreadHistory(
+    ttl_seconds=config.thread_history_ttl_seconds,
+    max_threads=config.thread_history_max_threads,
+)
+
+summary_cache = (
+    SummaryCache(
+        ttl_seconds=config.summary_cache_ttl_seconds,
+        max_entries=config.summary_cache_max_entries,
+    )
+    if config.summary_cache_enabled
+    else None
+)
+
+daily_digests = (
+    DailyDigests(
+        cache,
+        summary_cache,
+        config,
+        channels=prefetch_scheduler.hot_channels,
+        interval_seconds=config.digest_interval_seconds,
+    )
+    if summary_cache and config.digest_enabled
+    else None
+)
+
+orchestrator_agent = OrchestratorAgent(cache, summary_cache)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if config.prefetch_enabled:
+        prefetch_scheduler.start()
+    if daily_digests:
+        daily_digests.start()
+    yield
+    if daily_digests:
+        await daily_digests.stop()
+    await prefetch_scheduler.stop()
+    await upstream_client.aclose()
+
+
+app = FastAPI(title="Podsumowywator Hackathon Bbackend API", lifespan=lifespan)
 
 
 @app.exception_handler(RequestValidationError)
@@ -33,14 +118,49 @@ async def root():
     return {"message": "Welcome to the Podsumowywator Hackathon Bbackend API"}
 
 
+async def _digest_answer(
+    request: SummaryRequest, thread_update: ThreadUpdate
+) -> Optional[str]:
+    """Answer plain questions about a closed day from its digest, if one is ready."""
+    if not daily_digests or not thread_update.new_messages:
+        return None
+    return await daily_digests.answer(
+        request.channel_id, thread_update.new_messages[-1].message
+    )
+
+
+async def _gzip_stream(chunks: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    """Gzip a text stream, flushing every chunk so the stream stays incremental."""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    async for chunk in chunks:
+        yield compressor.compress(chunk.encode()) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _summarize_request(request: SummaryRequest) -> dict:
+    prefetch_scheduler.record_request(request.channel_id)
+    # Everything the tools store for this request is freed when the scope ends
+    with MessageMemory.scope():
+        logger.info(f"Saving thread {request.thread_id} messages")
+        thread_update = thread_history.append(request.thread_id, request.messages)
+        MessageMemory.store_thread(request.thread_id, thread_update.history)
+
+        digest = await _digest_answer(request, thread_update)
+        if digest is not None:
+            return {"message": digest}
+
+        return await orchestrator_agent.get_summary(request, thread_update)
+
+
 @app.post("/ruchniecie")
 async def summarize(request: SummaryRequest):
     try:
         logger.info(f"Received summary request for channel: {request.channel_id}")
-        logger.info(f"Saving thread {request.thread_id} messages")
-        MessageMemory.store_thread(request.thread_id, request.messages)
-
-        result = await orchestrator_agent.get_summary(request)
+        result = await _summarize_request(request)
         logger.info("Successfully generated summary")
         return result
     except Exception as e:
@@ -49,19 +169,203 @@ async def summarize(request: SummaryRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/ruchniecie/batch")
+async def summarize_batch(batch: BatchSummaryRequest):
+    """
+    Summarize many requests, streaming one NDJSON result per request as it completes.
+
+    Requests of the same channel run one after another, so the later ones reuse
+    the messages and summaries the first one cached, while different channels
+    run concurrently up to batch_max_concurrency. Every result carries the
+    index of its request, and either the message or the error.
+    """
+    if len(batch.requests) > config.batch_max_requests:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {config.batch_max_requests} requests per batch",
+        )
+    logger.info(f"Received batch of {len(batch.requests)} summary requests")
+
+    groups: dict[str, list[tuple[int, SummaryRequest]]] = {}
+    for index, request in enumerate(batch.requests):
+        groups.setdefault(request.channel_id, []).append((index, request))
+
+    semaphore = asyncio.Semaphore(config.batch_max_concurrency)
+    results: asyncio.Queue[dict] = asyncio.Queue()
+
+    async def run_group(requests: list[tuple[int, SummaryRequest]]) -> None:
+        async with semaphore:
+            for index, request in requests:
+                result = {
+                    "index": index,
+                    "channelId": request.channel_id,
+                    "threadId": request.thread_id,
+                }
+                try:
+                    result.update(await _summarize_request(request))
+                except Exception as e:
+                    logger.error(f"Error processing batch request {index}: {str(e)}")
+                    logger.exception(e)
+                    result["error"] = str(e)
+                await results.put(result)
+
+    async def lines():
+        tasks = [asyncio.create_task(run_group(group)) for group in groups.values()]
+        try:
+            for _ in batch.requests:
+                yield json.dumps(await results.get(), ensure_ascii=False) + "\n"
+            logger.info(f"Completed batch of {len(batch.requests)} summary requests")
+        finally:
+            # Stop the remaining work when the client goes away
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@app.post("/ruchniecie/stream")
+async def summarize_stream(request: SummaryRequest):
+    """
+    Stream the progress and the answer of a summary request as Server-Sent Events:
+    tool_started, tool_finished, messages_loaded, delta with pieces of the answer,
+    then final with the whole answer, or error if the request failed.
+    """
+    logger.info(f"Received streamed summary request for channel: {request.channel_id}")
+    prefetch_scheduler.record_request(request.channel_id)
+
+    async def events():
+        try:
+            with MessageMemory.scope():
+                thread_update = thread_history.append(
+                    request.thread_id, request.messages
+                )
+                MessageMemory.store_thread(request.thread_id, thread_update.history)
+
+                digest = await _digest_answer(request, thread_update)
+                if digest is not None:
+                    yield _sse("final", {"message": digest})
+                    return
+
+                async for event, data in orchestrator_agent.stream_summary(
+                    request, thread_update
+                ):
+                    yield _sse(event, data)
+            logger.info("Successfully streamed summary")
+        except Exception as e:
+            # The response has started already, so the error is sent as an event
+            logger.error(f"Error processing streamed summary request: {str(e)}")
+            logger.exception(e)
+            yield _sse("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/cache")
 async def get_cache():
     try:
-        logger.info("Fetching cache data")
-        cache_data = cache.get()
-        logger.info("Successfully fetched cache data")
-        return cache_data
+        logger.info("Fetching cache summary")
+        return cache.summary()
     except Exception as e:
         logger.error(f"Error fetching cache data: {str(e)}")
         logger.exception(e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/cache/export")
+async def export_cache(request: Request, channel_id: Optional[str] = None):
+    """
+    Stream the cached messages as NDJSON, one message per line.
+    The export is gzipped when the client accepts it, the only response that is,
+    since compressing streamed summaries would hold their events back.
+    """
+
+    async def lines():
+        for cached_channel_id, messages in cache.iter_cached(channel_id):
+            yield "".join(
+                json.dumps(
+                    {"channelId": cached_channel_id, **msg.model_dump(by_alias=True)}
+                )
+                + "\n"
+                for msg in messages
+            )
+            # Let other requests run between chunks
+            await asyncio.sleep(0)
+
+    if "gzip" in request.headers.get("accept-encoding", "").lower():
+        return StreamingResponse(
+            _gzip_stream(lines()),
+            media_type="application/x-ndjson",
+            headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"},
+        )
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Vary": "Accept-Encoding"},
+    )
+
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    return {
+        **cache.stats.to_dict(),
+        "size_bytes": cache.size_bytes,
+        "channels_cached": len(cache.cache),
+        "summaries": summary_cache.to_dict() if summary_cache else None,
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    metrics = cache.stats.to_prometheus(
+        {
+            "size_bytes": (
+                "Approximate memory used by cached messages.",
+                cache.size_bytes,
+            ),
+            "channels": ("Channels with cached ranges.", len(cache.cache)),
+        },
+        counters={
+            "evicted_bytes_total": (
+                "Approximate memory freed by evictions.",
+                cache.eviction_stats.evicted_bytes,
+            ),
+            "summary_hits_total": (
+                "Daily summaries reused from the summary cache.",
+                summary_cache.hits if summary_cache else 0,
+            ),
+            "summary_misses_total": (
+                "Daily summaries that had to be generated.",
+                summary_cache.misses if summary_cache else 0,
+            ),
+        },
+    )
+    return PlainTextResponse(metrics, media_type="text/plain; version=0.0.4")
+
+
+@app.get("/cache/{channel_id}")
+async def get_cached_messages(
+    channel_id: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+):
+    if channel_id not in cache.cache:
+        raise HTTPException(status_code=404, detail="Channel is not cached")
+    total, messages = cache.page(channel_id, start_date, end_date, offset, limit)
+    return {
+        "channelId": channel_id,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "messages": [msg.model_dump(by_alias=True) for msg in messages],
+    }
+
+
 @app.delete("/cache")
 async def clear_cache():
     try:
@@ -1,16 +1,21 @@
 from agents import Agent, Runner
-from typing import Any
+from typing import Any, AsyncIterator
 from src.tools.read_through_cache import ReadThroughCache
+from src.tools.summary_cache import SummaryCache
 from src.config_loader import load_config
 from src.tools.orchestrator_tools import get_orchestrator_tools
 from src.dtos import SummaryRequest, ConversationContext
+from src.memory import MessageMemory, ThreadUpdate
+from src.tools.message_serializer import serialize_messages
 from src.prompts.orchestrator_prompt import ORCHESTRATOR_PROMPT
 from loguru import logger
-from datetime import datetime
+from datetime import datetime, timezone
 
 
 class OrchestratorAgent:
-    def __init__(self, cache: ReadThroughCache):
+    def __init__(
+        self, cache: ReadThroughCache, summary_cache: SummaryCache | None = None
+    ):
         self.config = load_config()
         self.agent = Agent(
             name="Orchestrator",
@@ -18,11 +23,43 @@ class OrchestratorAgent:
                 main_language=self.config.main_language
             ),
             model=self.config.orchestrator_model,
-            tools=get_orchestrator_tools(cache),
+            tools=get_orchestrator_tools(cache, summary_cache),
         )
 
-    async def get_summary(self, summary_request: SummaryRequest) -> dict[str, Any]:
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    def _thread_input(self, thread_update: ThreadUpdate) -> str:
+        """
+        Render the new turns of the thread with a compact context of the earlier ones:
+        the last few of them, shortened, and how many were left out.
+        New turns come first in the token budget, the context gets what is left.
+        """
+        budget = self.config.orchestrator_input_max_tokens
+        new = serialize_messages(thread_update.new_messages, max_tokens=budget)
+        if not thread_update.earlier_messages:
+            return new.text
+
+        earlier = thread_update.earlier_messages
+        turns = self.config.thread_context_turns
+        shown = earlier[-turns:] if turns > 0 else []
+        context = serialize_messages(
+            shown,
+            max_tokens=max(budget - new.tokens, 0),
+            max_chars_per_message=self.config.thread_context_max_chars,
+            mark_omitted=False,
+        )
+        lines = [
+            f"Earlier in the thread ({len(earlier) - len(shown) + context.omitted} "
+            "older messages omitted):"
+        ]
+        if context.omitted < len(shown):
+            lines.append(context.text)
+        lines.extend(["New messages:", new.text])
+        return "\n".join(lines)
+
+    def _run_input(
+        self, summary_request: SummaryRequest, thread_update: ThreadUpdate
+    ) -> tuple[str, ConversationContext]:
+        # Dates without a zone are read as UTC by the cache, the current time matches
+        current_time = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
         channel_id = summary_request.channel_id
         thread_id = summary_request.thread_id
 
@@ -32,17 +69,85 @@ class OrchestratorAgent:
         )
         logger.info(f"Conversation context: {conversation_context}")
 
-        messages_string = "\n".join(
-            [
-                f"{message.created_at} {message.username}: {message.message}"
-                for message in summary_request.messages
-            ]
-        )
+        messages_string = self._thread_input(thread_update)
         logger.info(f"Orchestrator agent input: {messages_string}")
+        return (
+            f"Thread ID: {thread_id}\nChannel ID: {channel_id}\nCurrent time: {current_time}\nMessages: {messages_string}",
+            conversation_context,
+        )
+
+    async def get_summary(
+        self, summary_request: SummaryRequest, thread_update: ThreadUpdate
+    ) -> dict[str, Any]:
+        input_text, conversation_context = self._run_input(
+            summary_request, thread_update
+        )
         result = await Runner.run(
             starting_agent=self.agent,
-            input=f"Thread ID: {thread_id}\nChannel ID: {channel_id}\nCurrent time: {current_time}\nMessages: {messages_string}",
+            input=input_text,
             context=conversation_context,
         )
         logger.info(f"Orchestrator agent result: {result.final_output}")
         return {"message": result.final_output}
+
+    async def stream_summary(
+        self, summary_request: SummaryRequest, thread_update: ThreadUpdate
+    ) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+        """
+        Run the orchestrator streamed, yielding (event, data) pairs as it progresses:
+        tool_started and tool_finished around tool calls, messages_loaded when
+        load_messages stored a range, delta for every piece of the answer text
+        and final with the whole answer.
+        """
+        input_text, conversation_context = self._run_input(
+            summary_request, thread_update
+        )
+        result = Runner.run_streamed(
+            starting_agent=self.agent,
+            input=input_text,
+            context=conversation_context,
+        )
+        # Tool names by call id, outputs only refer to their call
+        tool_calls: dict[str, str] = {}
+        async for event in result.stream_events():
+            if event.type == "raw_response_event":
+                if event.data.type == "response.output_text.delta":
+                    yield "delta", {"text": event.data.delta}
+            elif event.type == "run_item_stream_event":
+                if event.name == "tool_called":
+                    raw_item = event.item.raw_item
+                    name = getattr(raw_item, "name", None) or "tool"
+                    call_id = getattr(raw_item, "call_id", None)
+                    if call_id is not None:
+                        tool_calls[call_id] = name
+                    yield (
+                        "tool_started",
+                        {
+                            "tool": name,
+                            "arguments": getattr(raw_item, "arguments", None),
+                        },
+                    )
+                elif event.name == "tool_output":
+                    raw_item = event.item.raw_item
+                    call_id = (
+                        raw_item.get("call_id")
+                        if isinstance(raw_item, dict)
+                        else getattr(raw_item, "call_id", None)
+                    )
+                    name = tool_calls.get(call_id, "tool")
+                    yield "tool_finished", {"tool": name}
+                    if name == "load_messages":
+                        try:
+                            handle = MessageMemory.get_handle(str(event.item.output))
+                        except KeyError:
+                            continue
+                        yield (
+                            "messages_loaded",
+                            {
+                                "channel_id": handle.channel_id,
+                                "start_date": handle.start_date,
+                                "end_date": handle.end_date,
+                            },
+                        )
+        logger.info(f"Orchestrator agent streamed result: {result.final_output}")
+        yield "final", {"message": result.final_output}
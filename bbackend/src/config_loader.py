@@ -12,7 +12,39 @@ class Config:
     web_summarizer_model: str
     api_base_url: str
     timeout_seconds: int
+    upstream_max_connections: int
+    upstream_max_keepalive_connections: int
+    upstream_max_concurrent_fetches: int
     main_language: str
+    cache_max_bytes: int
+    cache_max_bytes_per_channel: int
+    cache_db_path: str | None
+    cache_shared: bool
+    cache_retention_days: int | None
+    cache_live_edge_ttl_seconds: int
+    prefetch_enabled: bool
+    prefetch_interval_seconds: int
+    prefetch_max_channels: int
+    prefetch_max_concurrency: int
+    prefetch_lookback_days: int
+    prefetch_quiet_hours: list[int] | None
+    memory_ttl_seconds: int
+    memory_max_entries: int
+    thread_history_ttl_seconds: int
+    thread_history_max_threads: int
+    thread_context_turns: int
+    thread_context_max_chars: int
+    summarizer_chunk_tokens: int
+    summarizer_max_concurrency: int
+    summarizer_max_input_tokens: int
+    orchestrator_input_max_tokens: int
+    summary_cache_enabled: bool
+    summary_cache_ttl_seconds: int
+    summary_cache_max_entries: int
+    digest_enabled: bool
+    digest_interval_seconds: int
+    batch_max_requests: int
+    batch_max_concurrency: int
 
 
 def load_config() -> Config:
@@ -8,6 +8,7 @@ class Image(BaseModel):
 
 
 class Message(BaseModel):
+    id: str | None = None
     username: str
     message: str
     images: list[Image]
@@ -20,6 +21,10 @@ class SummaryRequest(BaseModel):
     thread_id: str = Field(alias="threadId")
 
 
+class BatchSummaryRequest(BaseModel):
+    requests: list[SummaryRequest]
+
+
 class ConversationContext(BaseModel):
     current_date: str
     config: Config
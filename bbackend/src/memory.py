@@ -1,37 +1,182 @@
+import time
 import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Generic, Iterator, TypeVar
 from src.dtos import Message
+from src.tools.cache_index import message_key
 from loguru import logger
 
+T = TypeVar("T")
+
+
+@dataclass
+class MessageHandle:
+    """
+    View of a channel range in the message cache.
+    Messages are read from the cache when resolved instead of being copied into memory.
+    """
+
+    channel_id: str
+    start_date: str
+    end_date: str
+    loader: Callable[[str, str, str], Awaitable[list[Message]]]
+
+    async def resolve(self) -> list[Message]:
+        return await self.loader(self.channel_id, self.start_date, self.end_date)
+
+
+class BoundedStore(Generic[T]):
+    """Mapping whose entries expire after a TTL since last use, bounded in size by LRU."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # Values with the time of their last use, least recently used first
+        self._entries: OrderedDict[str, tuple[T, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def _expire(self, now: float) -> None:
+        while self._entries:
+            key, (_, used_at) = next(iter(self._entries.items()))
+            if (
+                now - used_at < self.ttl_seconds
+                and len(self._entries) <= self.max_entries
+            ):
+                break
+            del self._entries[key]
+            logger.debug(f"Expired memory entry {key}")
+
+    def put(self, key: str, value: T) -> None:
+        now = time.monotonic()
+        self._entries[key] = (value, now)
+        self._entries.move_to_end(key)
+        self._expire(now)
+
+    def get(self, key: str) -> T:
+        """Return the value of a key and mark it as used, KeyError if missing or expired."""
+        now = time.monotonic()
+        self._expire(now)
+        value, _ = self._entries[key]
+        self._entries[key] = (value, now)
+        self._entries.move_to_end(key)
+        return value
+
+    def pop(self, key: str) -> bool:
+        """Remove a key, returning whether it was present."""
+        return self._entries.pop(key, None) is not None
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class RequestMemory:
+    """
+    Messages shared between the tools of a single request.
+    Entries expire after a TTL and are bounded in number even within the request.
+    """
+
+    ttl_seconds: float = 900
+    max_entries: int = 1000
+
+    def __init__(self):
+        self.messages: BoundedStore[MessageHandle] = BoundedStore(
+            self.ttl_seconds, self.max_entries
+        )
+        self.threads: BoundedStore[list[Message]] = BoundedStore(
+            self.ttl_seconds, self.max_entries
+        )
+        self.stored_handles = 0
+        self.retrieved_messages = 0
+
+    def clear(self) -> None:
+        self.messages.clear()
+        self.threads.clear()
+
+
+_current_memory: ContextVar[RequestMemory | None] = ContextVar(
+    "request_memory", default=None
+)
+
 
 class MessageMemory:
-    """In-memory storage for messages that need to be shared between tools."""
+    """
+    In-memory storage for messages that need to be shared between tools.
 
-    _messages: dict[str, list[Message]] = {}
-    _threads: dict[str, list[Message]] = {}
+    Every request works in its own RequestMemory, set up by scope() and resolved
+    through a context variable, so tools of concurrent requests never see each
+    other's entries and everything a request stored is freed when it ends.
+    Loaded messages are kept as handles into the cache and thread messages as the
+    lists received with the request.
+    """
 
     @classmethod
-    def store_messages(cls, messages: list[Message]) -> str:
-        messages_uuid = str(uuid.uuid4())
-        cls._messages[messages_uuid] = messages
-        logger.info(f"Stored {len(messages)} messages with UUID: {messages_uuid}")
-        return messages_uuid
+    def configure(cls, ttl_seconds: float, max_entries: int) -> None:
+        RequestMemory.ttl_seconds = ttl_seconds
+        RequestMemory.max_entries = max_entries
 
     @classmethod
-    def get_messages(cls, messages_uuid: str) -> list[Message]:
+    @contextmanager
+    def scope(cls) -> Iterator[RequestMemory]:
+        """Run the enclosed code, and the tasks it starts, with a fresh request memory."""
+        memory = RequestMemory()
+        token = _current_memory.set(memory)
         try:
-            messages = cls._messages[messages_uuid]
+            yield memory
+        finally:
+            _current_memory.reset(token)
             logger.info(
-                f"Retrieved {len(messages)} messages with UUID: {messages_uuid}"
+                f"Released request memory: {memory.stored_handles} handles stored, "
+                f"{memory.retrieved_messages} messages retrieved"
             )
-            return messages
+            memory.clear()
+
+    @classmethod
+    def current(cls) -> RequestMemory:
+        memory = _current_memory.get()
+        if memory is None:
+            raise RuntimeError("MessageMemory used outside of a request scope")
+        return memory
+
+    @classmethod
+    def store_messages(cls, handle: MessageHandle) -> str:
+        memory = cls.current()
+        messages_uuid = str(uuid.uuid4())
+        memory.messages.put(messages_uuid, handle)
+        memory.stored_handles += 1
+        logger.info(
+            f"Stored messages of channel {handle.channel_id} from {handle.start_date} "
+            f"to {handle.end_date} with UUID: {messages_uuid}"
+        )
+        return messages_uuid
+
+    @classmethod
+    def get_handle(cls, messages_uuid: str) -> MessageHandle:
+        try:
+            return cls.current().messages.get(messages_uuid)
         except KeyError:
             logger.error(f"No messages found with UUID: {messages_uuid}")
             raise KeyError(f"No messages found with UUID: {messages_uuid}")
 
+    @classmethod
+    async def get_messages(cls, messages_uuid: str) -> list[Message]:
+        memory = cls.current()
+        handle = cls.get_handle(messages_uuid)
+        messages = await handle.resolve()
+        memory.retrieved_messages += len(messages)
+        logger.info(f"Retrieved {len(messages)} messages with UUID: {messages_uuid}")
+        return messages
+
     @classmethod
     def delete_messages(cls, messages_uuid: str) -> None:
-        if messages_uuid in cls._messages:
-            del cls._messages[messages_uuid]
+        if cls.current().messages.pop(messages_uuid):
             logger.info(f"Deleted messages with UUID: {messages_uuid}")
         else:
             logger.warning(
@@ -40,9 +185,79 @@ class MessageMemory:
 
     @classmethod
     def store_thread(cls, thread_id: str, messages: list[Message]) -> None:
-        cls._threads[thread_id] = messages
+        cls.current().threads.put(thread_id, messages)
         logger.info(f"Stored {len(messages)} messages with thread ID: {thread_id}")
 
     @classmethod
     def get_thread(cls, thread_id: str) -> list[Message]:
-        return cls._threads[thread_id]
+        return cls.current().threads.get(thread_id)
+
+
+# Messages kept per thread, older ones are dropped first
+THREAD_MAX_MESSAGES = 1000
+# Keys of seen messages kept per thread, including dropped ones, so that a resent
+# thread does not bring its dropped messages back as new
+THREAD_MAX_SEEN_KEYS = 10 * THREAD_MAX_MESSAGES
+
+
+@dataclass
+class ThreadUpdate:
+    """Result of appending a request's messages to its thread."""
+
+    # The whole known thread, oldest message first
+    history: list[Message]
+    # Messages of the request that were not in the thread yet
+    new_messages: list[Message]
+
+    @property
+    def earlier_messages(self) -> list[Message]:
+        return self.history[: max(len(self.history) - len(self.new_messages), 0)]
+
+
+@dataclass
+class _Thread:
+    messages: list[Message]
+    # Keys of the messages seen in the thread, oldest first
+    keys: dict[str, None]
+
+
+class ThreadHistory:
+    """
+    Per-thread message history kept across requests.
+
+    Requests may resend the whole thread or only its new messages, either way
+    only the messages not seen before are appended, identified by message_key.
+    """
+
+    def __init__(self, ttl_seconds: float, max_threads: int):
+        self._threads: BoundedStore[_Thread] = BoundedStore(ttl_seconds, max_threads)
+
+    def append(self, thread_id: str, messages: list[Message]) -> ThreadUpdate:
+        try:
+            thread = self._threads.get(thread_id)
+        except KeyError:
+            thread = _Thread(messages=[], keys={})
+            self._threads.put(thread_id, thread)
+
+        new_messages = []
+        for msg in messages:
+            key = message_key(msg)
+            if key not in thread.keys:
+                thread.keys[key] = None
+                new_messages.append(msg)
+        thread.messages.extend(new_messages)
+
+        # Dropped messages stay known by their keys, up to a larger bound
+        if len(thread.messages) > THREAD_MAX_MESSAGES:
+            del thread.messages[:-THREAD_MAX_MESSAGES]
+            new_messages = new_messages[-THREAD_MAX_MESSAGES:]
+        while len(thread.keys) > THREAD_MAX_SEEN_KEYS:
+            del thread.keys[next(iter(thread.keys))]
+
+        # A resent thread without new messages asks its last question again
+        if not new_messages:
+            new_messages = thread.messages[-1:]
+        logger.info(
+            f"Thread {thread_id}: {len(new_messages)} new of {len(thread.messages)} messages"
+        )
+        return ThreadUpdate(history=list(thread.messages), new_messages=new_messages)
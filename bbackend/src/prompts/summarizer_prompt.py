@@ -14,8 +14,11 @@ If tasked to answer particular query, you should answer to the query precise bas
 - Quantify information when possible (e.g., "3 team members agreed to...")
 - Highlight any deadlines or time-sensitive information
 - Keep summaries broad and high-level as users can request detailed followups about specific points
-- Note that images are enclosed in <Message images> tags
+- Messages are grouped under "## YYYY-MM-DD" day headers, each turn starts with its HH:MM UTC time and author, indented lines continue the turn of the same author
+- Images attached to a message are listed as [images: url, ...]
 - Regular webpage URLs appear directly in messages
+- URLs that repeat are written as references like [U1], the full URLs are listed under "URLs:" at the top, always pass the full URL to tools
+- A first line like [N earlier messages omitted] means the oldest messages did not fit, mention it when it matters for the query
 </ai-rules>
 
 <examples>
@@ -50,10 +53,13 @@ Summary:
 ---
 
 Messages:
-- John: Check out our new design mockups <Message images>url: design1.jpg\nextension: jpg\nurl: design2.jpg\nextension: jpg</Message images>
-- Sarah: These look great! Here's the documentation link: https://docs.example.com/design
-- Mike: I found some similar references here: http://design-patterns.com/examples
-- John: Thanks for sharing. The second mockup needs work though <Message images>url: feedback.png, extension: png</Message images>
+## 2025-04-26
+10:02 John: Check out our new design mockups
+  [images: design1.jpg, design2.jpg]
+10:05 Sarah: These look great! Here's the documentation link: https://docs.example.com/design
+10:06 Mike: I found some similar references here: http://design-patterns.com/examples
+10:09 John: Thanks for sharing. The second mockup needs work though
+  [images: feedback.png]
 Query: What was shared in the conversation?
 
 Answer:
@@ -63,7 +69,9 @@ Answer:
 ---
 
 Messages:
-- John: Check out our new design mockups <Message images>url: design1.jpg, extension: jpg</Message images>
+## 2025-04-26
+10:02 John: Check out our new design mockups
+  [images: design1.jpg]
 Query: What was shared in the conversation?
 *USE TOOL TO ANALYZE IMAGES*
 Answer:
@@ -92,3 +100,18 @@ Answer:
 • Authentication should come first
 </examples>
 """
+
+SUMMARIZER_REDUCE_PROMPT = """
+<objective>
+You receive partial summaries of consecutive parts of one long conversation, in chronological order, each marked with the time range it covers. Combine them into a single answer to the query, as if you had read the whole conversation.
+</objective>
+
+<ai-rules>
+- Always organize the answer in bullet point format
+- Merge points that repeat across parts and keep the most recent state of every topic
+- Keep decisions, action items, deadlines, names and key identifiers
+- Mention when something happened only when it matters for the query
+- Do not mention the parts or that the input was split
+- Keep the answer broad and high-level as users can request detailed followups about specific points
+</ai-rules>
+"""
@@ -0,0 +1,433 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from heapq import merge
+from operator import itemgetter
+import hashlib
+import sys
+from typing import Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+from loguru import logger
+from ..dtos import Image, Message
+
+# Ranges closer than this are considered touching and get merged before being split into blocks
+TOUCH_TOLERANCE_MS = 1000
+# Merged ranges are split into blocks at these UTC-aligned boundaries, so that
+# eviction frees a bounded part of a channel instead of all of its history
+BLOCK_MS = 24 * 60 * 60 * 1000
+
+# Rough overhead of a cached message: the slotted object, its list slot and timestamp
+MESSAGE_OVERHEAD_BYTES = 96
+# Rough overhead of an image: its (url, extension) tuple and the slot holding it
+IMAGE_OVERHEAD_BYTES = 64
+
+# Image tuple shared by all cached messages without images
+EMPTY_IMAGES: Tuple[Tuple[str, str], ...] = ()
+
+
+def parse_date(date_str: str) -> datetime:
+    """Convert a date string to a datetime object for comparison."""
+    # Handle ISO format dates with or without time components
+    try:
+        # For ISO format with 'Z' timezone marker (e.g., 2023-01-01T00:00:00.000Z)
+        if "Z" in date_str:
+            # Remove 'Z' and parse
+            clean_date = date_str.rstrip("Z")
+            return datetime.fromisoformat(clean_date)
+        # For ISO format with time component
+        elif "T" in date_str:
+            return datetime.fromisoformat(date_str)
+        # For date-only format
+        else:
+            return datetime.fromisoformat(f"{date_str}T00:00:00")
+    except ValueError:
+        # Fallback for any other format issues
+        logger.warning(f"Could not parse date: {date_str}, using default parsing")
+        return datetime.fromisoformat(date_str.split("T")[0] + "T00:00:00")
+
+
+def to_epoch_ms(dt: datetime) -> int:
+    """Convert a datetime to epoch milliseconds, treating naive values as UTC."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+def parse_epoch_ms(date_str: str) -> int:
+    """Parse a date string straight to epoch milliseconds."""
+    return to_epoch_ms(parse_date(date_str))
+
+
+def format_iso_ms(ts: int) -> str:
+    """Format epoch milliseconds as an ISO date string keeping the milliseconds."""
+    dt = datetime.fromtimestamp(ts / 1000, tz=timezone.utc)
+    return f"{dt:%Y-%m-%dT%H:%M:%S}.{ts % 1000:03d}Z"
+
+
+class CachedMessage:
+    """
+    Compact form of a Message kept in the cache.
+
+    Usernames and image extensions are interned, the creation time is epoch
+    milliseconds and images are tuples, with one shared tuple for messages without
+    images. Messages are converted back to the Message DTO only when they leave
+    the cache.
+    """
+
+    __slots__ = ("id", "username", "message", "created_at_ms", "images")
+
+    def __init__(
+        self,
+        id: Optional[str],
+        username: str,
+        message: str,
+        created_at_ms: int,
+        images: Tuple[Tuple[str, str], ...] = EMPTY_IMAGES,
+    ):
+        self.id = id
+        self.username = sys.intern(username)
+        self.message = message
+        self.created_at_ms = created_at_ms
+        self.images = images or EMPTY_IMAGES
+
+    @classmethod
+    def from_message(cls, message: Message) -> "CachedMessage":
+        return cls(
+            message.id,
+            message.username,
+            message.message,
+            parse_epoch_ms(message.created_at),
+            tuple((image.url, sys.intern(image.extension)) for image in message.images),
+        )
+
+    @property
+    def created_at(self) -> str:
+        return format_iso_ms(self.created_at_ms)
+
+    def to_message(self) -> Message:
+        # The fields were validated when the message entered the cache
+        return Message.model_construct(
+            id=self.id,
+            username=self.username,
+            message=self.message,
+            images=[
+                Image.model_construct(url=url, extension=extension)
+                for url, extension in self.images
+            ],
+            created_at=self.created_at,
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"CachedMessage(id={self.id!r}, username={self.username!r}, "
+            f"message={self.message!r}, created_at={self.created_at!r})"
+        )
+
+
+def to_messages(messages: Iterable[CachedMessage]) -> List[Message]:
+    """Convert cached messages to DTOs at the boundary of the cache."""
+    return [msg.to_message() for msg in messages]
+
+
+def message_key(message: Message | CachedMessage) -> str:
+    """
+    Stable identity of a message: the upstream id when present,
+    otherwise a hash of its creation time, author and content.
+    """
+    if message.id is not None:
+        return message.id
+    content = "\x1f".join([message.created_at, message.username, message.message])
+    return hashlib.sha1(content.encode()).hexdigest()
+
+
+def estimate_message_size(message: CachedMessage) -> int:
+    """
+    Approximate the number of bytes a cached message keeps alive.
+    Interned usernames and image extensions are shared, so they are not counted.
+    """
+    size = MESSAGE_OVERHEAD_BYTES + sys.getsizeof(message.message)
+    if message.id is not None:
+        size += sys.getsizeof(message.id)
+    for url, _ in message.images:
+        size += IMAGE_OVERHEAD_BYTES + sys.getsizeof(url)
+    return size
+
+
+def format_iso_date(ts: int) -> str:
+    """Format epoch milliseconds as ISO date string with time component."""
+    dt = datetime.fromtimestamp(ts / 1000, tz=timezone.utc)
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def subtract_ranges(
+    start_ts: int, end_ts: int, covered: Iterable[Tuple[int, int]]
+) -> List[Tuple[int, int]]:
+    """Return the parts of a range not covered by the given ranges sorted by start."""
+    gaps = []
+    current = start_ts
+    for covered_start, covered_end in covered:
+        if current < covered_start:
+            gaps.append((current, min(covered_start, end_ts)))
+        current = max(current, covered_end)
+        if current >= end_ts:
+            break
+    if current < end_ts:
+        gaps.append((current, end_ts))
+    return gaps
+
+
+@dataclass
+class DateRange:
+    start: str
+    end: str
+
+
+@dataclass
+class CacheEntry:
+    range: DateRange
+    # Messages sorted by creation time
+    messages: List[CachedMessage]
+    # Epoch milliseconds of the range bounds, parsed once when the entry is created
+    start_ts: int = field(default=0, repr=False)
+    end_ts: int = field(default=0, repr=False)
+    # Epoch milliseconds of each message creation time, parallel to messages
+    timestamps: array = field(default_factory=lambda: array("q"), repr=False)
+    # Approximate memory kept alive by the messages
+    size_bytes: int = field(default=0, repr=False)
+    # Logical clock of the last read or write, used for LRU eviction
+    last_access: int = field(default=0, repr=False)
+
+    @classmethod
+    def create(
+        cls,
+        start_ts: int,
+        end_ts: int,
+        messages: Sequence[Message | CachedMessage],
+    ):
+        """Create an entry from messages in any order, sorting them by creation time."""
+        cached = sorted(
+            (
+                msg
+                if isinstance(msg, CachedMessage)
+                else CachedMessage.from_message(msg)
+                for msg in messages
+            ),
+            key=lambda msg: msg.created_at_ms,
+        )
+        return cls(
+            range=DateRange(
+                start=format_iso_date(start_ts), end=format_iso_date(end_ts)
+            ),
+            messages=cached,
+            start_ts=start_ts,
+            end_ts=end_ts,
+            timestamps=array("q", (msg.created_at_ms for msg in cached)),
+            size_bytes=sum(estimate_message_size(msg) for msg in cached),
+        )
+
+    def bounds(self, start_ts: int, end_ts: int) -> Tuple[int, int]:
+        """Return the positions of the messages created within the range, bounds included."""
+        return (
+            bisect_left(self.timestamps, start_ts),
+            bisect_right(self.timestamps, end_ts),
+        )
+
+    def slice(self, start_ts: int, end_ts: int) -> List[CachedMessage]:
+        """Return the messages created within the range, bounds included."""
+        lo, hi = self.bounds(start_ts, end_ts)
+        return self.messages[lo:hi]
+
+
+def merge_entries(entries: List[CacheEntry]) -> CacheEntry:
+    """
+    Merge entries with distinct messages into one covering all of them.
+    Messages are appended to the first entry's lists in place, falling back to a
+    sorted merge only when the timestamps of consecutive entries interleave.
+    """
+    entries = sorted(entries, key=lambda entry: entry.start_ts)
+    messages = entries[0].messages
+    timestamps = entries[0].timestamps
+
+    for entry in entries[1:]:
+        if (
+            not timestamps
+            or not entry.timestamps
+            or timestamps[-1] <= entry.timestamps[0]
+        ):
+            messages.extend(entry.messages)
+            timestamps.extend(entry.timestamps)
+        else:
+            merged = list(
+                merge(
+                    zip(timestamps, messages),
+                    zip(entry.timestamps, entry.messages),
+                    key=itemgetter(0),
+                )
+            )
+            timestamps = array("q", (ts for ts, _ in merged))
+            messages = [msg for _, msg in merged]
+
+    start_ts = entries[0].start_ts
+    end_ts = max(entry.end_ts for entry in entries)
+    return CacheEntry(
+        range=DateRange(start=format_iso_date(start_ts), end=format_iso_date(end_ts)),
+        messages=messages,
+        start_ts=start_ts,
+        end_ts=end_ts,
+        timestamps=timestamps,
+        size_bytes=sum(entry.size_bytes for entry in entries),
+        last_access=max(entry.last_access for entry in entries),
+    )
+
+
+def split_entry(entry: CacheEntry, block_ms: int = BLOCK_MS) -> List[CacheEntry]:
+    """
+    Split an entry into pieces that each stay within one block.
+    A message at a block boundary belongs to the block it starts.
+    """
+    first_block = entry.start_ts // block_ms
+    last_block = (entry.end_ts - 1) // block_ms
+    if last_block <= first_block:
+        return [entry]
+
+    pieces = []
+    lo = 0
+    for block in range(first_block, last_block + 1):
+        piece_start = max(entry.start_ts, block * block_ms)
+        piece_end = min(entry.end_ts, (block + 1) * block_ms)
+        if block < last_block:
+            hi = bisect_left(entry.timestamps, piece_end, lo)
+        else:
+            hi = len(entry.messages)
+        messages = entry.messages[lo:hi]
+        pieces.append(
+            CacheEntry(
+                range=DateRange(
+                    start=format_iso_date(piece_start), end=format_iso_date(piece_end)
+                ),
+                messages=messages,
+                start_ts=piece_start,
+                end_ts=piece_end,
+                timestamps=entry.timestamps[lo:hi],
+                size_bytes=sum(estimate_message_size(msg) for msg in messages),
+                last_access=entry.last_access,
+            )
+        )
+        lo = hi
+    return pieces
+
+
+class ChannelIndex:
+    """
+    Cached date ranges of a single channel.
+
+    Entries are kept sorted by start and never overlap. Touching ranges are
+    merged and split again into blocks of BLOCK_MS, so entries touch only at
+    block boundaries and both the starts and the ends are monotonic and can be
+    searched with bisect.
+    The keys of all cached messages are kept in a persistent set, so a new range
+    is deduplicated by looking at its own messages only.
+    """
+
+    def __init__(self):
+        self._entries: List[CacheEntry] = []
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+        self._keys: Set[str] = set()
+        self.size_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[CacheEntry]:
+        return iter(self._entries)
+
+    def __getitem__(self, index: int) -> CacheEntry:
+        return self._entries[index]
+
+    def __repr__(self) -> str:
+        return f"ChannelIndex({self._entries!r})"
+
+    def find_covering(self, start_ts: int, end_ts: int) -> Optional[List[CacheEntry]]:
+        """Return the consecutive entries together containing the range, if any."""
+        i = bisect_right(self._starts, start_ts) - 1
+        if i < 0:
+            return None
+        j = i
+        while self._ends[j] < end_ts:
+            if j + 1 == len(self._entries) or self._starts[j + 1] != self._ends[j]:
+                return None
+            j += 1
+        return self._entries[i : j + 1]
+
+    def find_overlapping(self, start_ts: int, end_ts: int) -> List[CacheEntry]:
+        """Return entries overlapping the range, sorted by start."""
+        lo = bisect_left(self._ends, start_ts)
+        hi = bisect_right(self._starts, end_ts)
+        return self._entries[lo:hi]
+
+    def find_gaps(self, start_ts: int, end_ts: int) -> List[Tuple[int, int]]:
+        """Return the sub-ranges of the range that are not cached."""
+        return subtract_ranges(
+            start_ts,
+            end_ts,
+            (
+                (entry.start_ts, entry.end_ts)
+                for entry in self.find_overlapping(start_ts, end_ts)
+            ),
+        )
+
+    def insert(self, entry: CacheEntry) -> List[CacheEntry]:
+        """
+        Insert an entry, merging it with every entry it touches or overlaps and
+        splitting the result into blocks, which are returned.
+        Only the affected neighbours are replaced, the rest of the index is untouched.
+        """
+        entry = self._drop_known_messages(entry)
+        lo = bisect_left(self._ends, entry.start_ts - TOUCH_TOLERANCE_MS)
+        hi = bisect_right(self._starts, entry.end_ts + TOUCH_TOLERANCE_MS)
+
+        merged = entry
+        if lo < hi:
+            neighbours = self._entries[lo:hi]
+            self.size_bytes -= sum(n.size_bytes for n in neighbours)
+            merged = merge_entries(neighbours + [entry])
+
+        pieces = split_entry(merged)
+        self._entries[lo:hi] = pieces
+        self._starts[lo:hi] = [piece.start_ts for piece in pieces]
+        self._ends[lo:hi] = [piece.end_ts for piece in pieces]
+        self.size_bytes += sum(piece.size_bytes for piece in pieces)
+        return pieces
+
+    def remove(self, entry: CacheEntry) -> None:
+        """Remove an entry, making its range missing again."""
+        i = bisect_left(self._starts, entry.start_ts)
+        if i < len(self._entries) and self._entries[i] is entry:
+            del self._entries[i]
+            del self._starts[i]
+            del self._ends[i]
+            self.size_bytes -= entry.size_bytes
+            self._keys.difference_update(message_key(msg) for msg in entry.messages)
+
+    def _drop_known_messages(self, entry: CacheEntry) -> CacheEntry:
+        """Remove messages already cached for the channel from a new entry."""
+        keep = []
+        for i, msg in enumerate(entry.messages):
+            key = message_key(msg)
+            if key not in self._keys:
+                self._keys.add(key)
+                keep.append(i)
+
+        if len(keep) == len(entry.messages):
+            return entry
+        messages = [entry.messages[i] for i in keep]
+        return CacheEntry(
+            range=entry.range,
+            messages=messages,
+            start_ts=entry.start_ts,
+            end_ts=entry.end_ts,
+            timestamps=array("q", (entry.timestamps[i] for i in keep)),
+            size_bytes=sum(estimate_message_size(msg) for msg in messages),
+            last_access=entry.last_access,
+        )
@@ -0,0 +1,184 @@
+from collections import defaultdict
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# Upper bounds of the latency histogram buckets in seconds
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+METRICS_PREFIX = "podsumowywator_cache"
+
+
+@dataclass
+class EvictionStats:
+    evictions: int = 0
+    evicted_bytes: int = 0
+    evicted_messages: int = 0
+
+
+@dataclass
+class Histogram:
+    """Cumulative latency histogram with fixed buckets."""
+
+    counts: List[int] = field(default_factory=lambda: [0] * len(LATENCY_BUCKETS))
+    sum: float = 0.0
+    count: int = 0
+
+    def observe(self, seconds: float) -> None:
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "buckets": {
+                str(bound): n for bound, n in zip(LATENCY_BUCKETS, self.counts)
+            },
+            "sum": self.sum,
+            "count": self.count,
+        }
+
+
+@dataclass
+class ChannelStats:
+    full_hits: int = 0
+    partial_hits: int = 0
+    misses: int = 0
+    storage_ranges: int = 0
+    fetched_ranges: int = 0
+    fetched_bytes: int = 0
+    fetched_messages: int = 0
+    failed_fetches: int = 0
+    evictions: int = 0
+    load_latency: Histogram = field(default_factory=Histogram)
+    upstream_latency: Histogram = field(default_factory=Histogram)
+
+    def counters(self) -> Dict[str, int]:
+        return {
+            name: value
+            for name, value in asdict(self).items()
+            if isinstance(value, int)
+        }
+
+
+class CacheStats:
+    """Counters and latency histograms of ReadThroughCache, kept per channel."""
+
+    def __init__(self):
+        self.channels: Dict[str, ChannelStats] = defaultdict(ChannelStats)
+        self.eviction_stats = EvictionStats()
+
+    def channel(self, channel_id: str) -> ChannelStats:
+        return self.channels[channel_id]
+
+    def clear(self) -> None:
+        self.channels.clear()
+        self.eviction_stats = EvictionStats()
+
+    def totals(self) -> Dict[str, int]:
+        totals: Dict[str, int] = defaultdict(int)
+        for stats in self.channels.values():
+            for name, value in stats.counters().items():
+                totals[name] += value
+        lookups = totals["full_hits"] + totals["partial_hits"] + totals["misses"]
+        totals["hit_ratio"] = totals["full_hits"] / lookups if lookups else 0.0
+        return dict(totals)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON friendly snapshot of all statistics."""
+        return {
+            "totals": self.totals(),
+            "evictions": asdict(self.eviction_stats),
+            "channels": {
+                channel_id: {
+                    **stats.counters(),
+                    "load_latency": stats.load_latency.to_dict(),
+                    "upstream_latency": stats.upstream_latency.to_dict(),
+                }
+                for channel_id, stats in self.channels.items()
+            },
+        }
+
+    def to_prometheus(
+        self,
+        gauges: Dict[str, Tuple[str, float]],
+        counters: Optional[Dict[str, Tuple[str, float]]] = None,
+    ) -> str:
+        """
+        Render the statistics in the Prometheus text exposition format.
+
+        Args:
+            gauges: Extra gauges by metric name, as (help text, value)
+            counters: Extra counters by metric name ending in _total, as (help text, value)
+        """
+        lines: List[str] = []
+
+        channel_counters = [
+            ("lookups_total", "Cache loads by result."),
+            ("storage_ranges_total", "Ranges read from the storage tier."),
+            ("fetched_ranges_total", "Ranges fetched from the messages API."),
+            ("fetched_bytes_total", "Bytes received from the messages API."),
+            ("fetched_messages_total", "Messages received from the messages API."),
+            ("failed_fetches_total", "Failed calls to the messages API."),
+            ("evictions_total", "Cached ranges evicted over the memory budget."),
+        ]
+        for name, help_text in channel_counters:
+            lines.append(f"# HELP {METRICS_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRICS_PREFIX}_{name} counter")
+            for channel_id, stats in self.channels.items():
+                channel = _label(channel_id)
+                if name == "lookups_total":
+                    for result in ("full_hit", "partial_hit", "miss"):
+                        value = getattr(
+                            stats, f"{result}s" if result != "miss" else "misses"
+                        )
+                        lines.append(
+                            f'{METRICS_PREFIX}_{name}{{channel="{channel}",result="{result}"}} {value}'
+                        )
+                else:
+                    value = getattr(stats, name.removesuffix("_total"))
+                    lines.append(
+                        f'{METRICS_PREFIX}_{name}{{channel="{channel}"}} {value}'
+                    )
+
+        histograms = [
+            ("load_seconds", "load_latency", "Latency of cache loads."),
+            ("upstream_seconds", "upstream_latency", "Latency of messages API calls."),
+        ]
+        for name, attribute, help_text in histograms:
+            lines.append(f"# HELP {METRICS_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRICS_PREFIX}_{name} histogram")
+            for channel_id, stats in self.channels.items():
+                channel = _label(channel_id)
+                histogram: Histogram = getattr(stats, attribute)
+                for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+                    lines.append(
+                        f'{METRICS_PREFIX}_{name}_bucket{{channel="{channel}",le="{bound}"}} {count}'
+                    )
+                lines.append(
+                    f'{METRICS_PREFIX}_{name}_bucket{{channel="{channel}",le="+Inf"}} {histogram.count}'
+                )
+                lines.append(
+                    f'{METRICS_PREFIX}_{name}_sum{{channel="{channel}"}} {histogram.sum}'
+                )
+                lines.append(
+                    f'{METRICS_PREFIX}_{name}_count{{channel="{channel}"}} {histogram.count}'
+                )
+
+        for name, (help_text, value) in gauges.items():
+            lines.append(f"# HELP {METRICS_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRICS_PREFIX}_{name} gauge")
+            lines.append(f"{METRICS_PREFIX}_{name} {value}")
+
+        for name, (help_text, value) in (counters or {}).items():
+            lines.append(f"# HELP {METRICS_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRICS_PREFIX}_{name} counter")
+            lines.append(f"{METRICS_PREFIX}_{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _label(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
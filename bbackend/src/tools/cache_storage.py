@@ -0,0 +1,337 @@
+import json
+import sqlite3
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+from loguru import logger
+from .cache_index import (
+    TOUCH_TOLERANCE_MS,
+    CachedMessage,
+    message_key,
+)
+
+
+class CacheStorage(ABC):
+    """Persistent storage tier behind the in-memory ReadThroughCache."""
+
+    @abstractmethod
+    def find_covered(
+        self, channel_id: str, start_ts: int, end_ts: int
+    ) -> List[Tuple[int, int]]:
+        """Return the stored sub-ranges of the range, clipped to it and sorted by start."""
+
+    @abstractmethod
+    def load_messages(
+        self, channel_id: str, start_ts: int, end_ts: int
+    ) -> List[CachedMessage]:
+        """Return the stored messages created within the range, sorted by creation time."""
+
+    @abstractmethod
+    def store(
+        self,
+        channel_id: str,
+        start_ts: int,
+        end_ts: int,
+        messages: List[CachedMessage],
+    ) -> None:
+        """Store the messages of a fetched range and mark the range as covered."""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Remove everything from the storage."""
+
+    # Whether other processes use the storage at the same time
+    shared = False
+
+    def try_lease(
+        self, channel_id: str, start_ts: int, end_ts: int, owner: str, ttl_ms: int
+    ) -> bool:
+        """
+        Claim the fetch of a range, so that processes sharing the storage fetch it once.
+        Returns False while another owner holds an unexpired lease overlapping the range.
+        """
+        return True
+
+    def release_lease(
+        self, channel_id: str, start_ts: int, end_ts: int, owner: str
+    ) -> None:
+        """Release a lease claimed by try_lease."""
+
+
+class SQLiteCacheStorage(CacheStorage):
+    """
+    Cache storage in a local SQLite database.
+
+    Messages are indexed by (channel_id, created_at_ms) and the fetched ranges are kept
+    merged in a separate table, so both lookups are indexed range scans.
+
+    In shared mode several worker processes open the same file. The database runs in
+    WAL mode so readers never block the writer, it is memory-mapped so the workers read
+    the same pages of the OS page cache, and fetches are coordinated by leases.
+    """
+
+    # Bump when the schema changes, older databases are rebuilt from scratch
+    SCHEMA_VERSION = 1
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS messages (
+            channel_id TEXT NOT NULL,
+            message_key TEXT NOT NULL,
+            created_at_ms INTEGER NOT NULL,
+            id TEXT,
+            username TEXT NOT NULL,
+            message TEXT NOT NULL,
+            images TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            PRIMARY KEY (channel_id, message_key)
+        );
+        CREATE INDEX IF NOT EXISTS messages_created_at
+            ON messages (channel_id, created_at_ms);
+        CREATE TABLE IF NOT EXISTS covered_ranges (
+            channel_id TEXT NOT NULL,
+            start_ms INTEGER NOT NULL,
+            end_ms INTEGER NOT NULL,
+            PRIMARY KEY (channel_id, start_ms)
+        );
+        CREATE TABLE IF NOT EXISTS fetch_leases (
+            channel_id TEXT NOT NULL,
+            start_ms INTEGER NOT NULL,
+            end_ms INTEGER NOT NULL,
+            owner TEXT NOT NULL,
+            expires_ms INTEGER NOT NULL,
+            PRIMARY KEY (channel_id, start_ms, owner)
+        );
+    """
+    # Size of the memory-mapped part of the database file in shared mode
+    MMAP_SIZE = 256 * 1024 * 1024
+    # How often a store also drops what fell out of the retention window
+    PRUNE_INTERVAL_MS = 60 * 60 * 1000
+
+    def __init__(
+        self,
+        path: str | Path,
+        shared: bool = False,
+        busy_timeout_ms: int = 5000,
+        retention_days: Optional[float] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            path: Location of the database file
+            shared: Prepare the database for concurrent use by several processes
+            busy_timeout_ms: How long a write waits for another process to release the lock
+            retention_days: How long stored messages are kept, by creation time,
+                forever if None
+            clock: Source of the current time in epoch seconds
+        """
+        self.path = str(path)
+        self.shared = shared
+        self.retention_days = retention_days
+        self._now = clock
+        self._next_prune_ms = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            self.path, check_same_thread=False, timeout=busy_timeout_ms / 1000
+        )
+        if shared:
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.execute("PRAGMA synchronous = NORMAL")
+            self._connection.execute(f"PRAGMA busy_timeout = {busy_timeout_ms}")
+            self._connection.execute(f"PRAGMA mmap_size = {self.MMAP_SIZE}")
+        with self._lock, self._connection:
+            # Only one process checks and rebuilds the schema at a time
+            self._connection.execute("BEGIN IMMEDIATE")
+            (version,) = self._connection.execute("PRAGMA user_version").fetchone()
+            if version != self.SCHEMA_VERSION:
+                logger.info(f"Rebuilding cache storage with schema {version}")
+                for table in ("messages", "covered_ranges", "fetch_leases"):
+                    self._connection.execute(f"DROP TABLE IF EXISTS {table}")
+            # executescript would commit first, so the statements run one by one
+            for statement in self.SCHEMA.split(";"):
+                if statement.strip():
+                    self._connection.execute(statement)
+            self._connection.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        logger.info(f"Using SQLite cache storage at {self.path}")
+
+    def find_covered(
+        self, channel_id: str, start_ts: int, end_ts: int
+    ) -> List[Tuple[int, int]]:
+        with self._lock:
+            rows = self._connection.execute(
+                """
+                SELECT start_ms, end_ms FROM covered_ranges
+                WHERE channel_id = ? AND start_ms <= ? AND end_ms >= ?
+                ORDER BY start_ms
+                """,
+                (channel_id, end_ts, start_ts),
+            ).fetchall()
+        return [
+            (max(start_ms, start_ts), min(end_ms, end_ts)) for start_ms, end_ms in rows
+        ]
+
+    def load_messages(
+        self, channel_id: str, start_ts: int, end_ts: int
+    ) -> List[CachedMessage]:
+        with self._lock:
+            rows = self._connection.execute(
+                """
+                SELECT id, username, message, images, created_at_ms FROM messages
+                WHERE channel_id = ? AND created_at_ms BETWEEN ? AND ?
+                ORDER BY created_at_ms, rowid
+                """,
+                (channel_id, start_ts, end_ts),
+            ).fetchall()
+        # Rows were validated when stored, so they go straight to the cached form
+        return [
+            CachedMessage(
+                message_id,
+                username,
+                message,
+                created_at_ms,
+                tuple(
+                    (image["url"], sys.intern(image["extension"]))
+                    for image in json.loads(images)
+                ),
+            )
+            for message_id, username, message, images, created_at_ms in rows
+        ]
+
+    def store(
+        self,
+        channel_id: str,
+        start_ts: int,
+        end_ts: int,
+        messages: List[CachedMessage],
+    ) -> None:
+        rows = [
+            (
+                channel_id,
+                message_key(msg),
+                msg.created_at_ms,
+                msg.id,
+                msg.username,
+                msg.message,
+                json.dumps(
+                    [
+                        {"url": url, "extension": extension}
+                        for url, extension in msg.images
+                    ]
+                ),
+                msg.created_at,
+            )
+            for msg in messages
+        ]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                """
+                INSERT OR IGNORE INTO messages
+                (channel_id, message_key, created_at_ms, id, username, message, images, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+
+            # Merge the new range with the stored ranges it touches
+            start_ms, end_ms = self._connection.execute(
+                """
+                SELECT MIN(MIN(start_ms), ?), MAX(MAX(end_ms), ?) FROM covered_ranges
+                WHERE channel_id = ? AND start_ms <= ? AND end_ms >= ?
+                """,
+                (
+                    start_ts,
+                    end_ts,
+                    channel_id,
+                    end_ts + TOUCH_TOLERANCE_MS,
+                    start_ts - TOUCH_TOLERANCE_MS,
+                ),
+            ).fetchone()
+            # Aggregates over no rows are NULL, in which case the new range stays as is
+            start_ms = start_ts if start_ms is None else start_ms
+            end_ms = end_ts if end_ms is None else end_ms
+            self._connection.execute(
+                """
+                DELETE FROM covered_ranges
+                WHERE channel_id = ? AND start_ms <= ? AND end_ms >= ?
+                """,
+                (
+                    channel_id,
+                    end_ts + TOUCH_TOLERANCE_MS,
+                    start_ts - TOUCH_TOLERANCE_MS,
+                ),
+            )
+            self._connection.execute(
+                "INSERT INTO covered_ranges (channel_id, start_ms, end_ms) VALUES (?, ?, ?)",
+                (channel_id, start_ms, end_ms),
+            )
+            self._prune()
+
+    def _prune(self) -> None:
+        """
+        Drop the messages created before the retention window, at most once per
+        PRUNE_INTERVAL_MS. Called within the write transaction of a store.
+        """
+        now_ms = int(self._now() * 1000)
+        if self.retention_days is None or now_ms < self._next_prune_ms:
+            return
+        self._next_prune_ms = now_ms + self.PRUNE_INTERVAL_MS
+        cutoff_ms = now_ms - int(self.retention_days * 24 * 60 * 60 * 1000)
+        deleted = self._connection.execute(
+            "DELETE FROM messages WHERE created_at_ms < ?", (cutoff_ms,)
+        ).rowcount
+        self._connection.execute(
+            "DELETE FROM covered_ranges WHERE end_ms <= ?", (cutoff_ms,)
+        )
+        # Ranges are disjoint per channel, so at most one of each reaches past the cutoff
+        self._connection.execute(
+            "UPDATE covered_ranges SET start_ms = ? WHERE start_ms < ?",
+            (cutoff_ms, cutoff_ms),
+        )
+        if deleted:
+            logger.info(
+                f"Pruned {deleted} messages older than {self.retention_days} days"
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM messages")
+            self._connection.execute("DELETE FROM covered_ranges")
+
+    def try_lease(
+        self, channel_id: str, start_ts: int, end_ts: int, owner: str, ttl_ms: int
+    ) -> bool:
+        now_ms = int(time.time() * 1000)
+        with self._lock, self._connection:
+            # Check and claim in one write transaction, so two processes cannot both win
+            self._connection.execute("BEGIN IMMEDIATE")
+            self._connection.execute(
+                "DELETE FROM fetch_leases WHERE expires_ms <= ?", (now_ms,)
+            )
+            held = self._connection.execute(
+                """
+                SELECT 1 FROM fetch_leases
+                WHERE channel_id = ? AND start_ms < ? AND end_ms > ? AND owner != ?
+                LIMIT 1
+                """,
+                (channel_id, end_ts, start_ts, owner),
+            ).fetchone()
+            if held is not None:
+                return False
+            self._connection.execute(
+                """
+                INSERT OR REPLACE INTO fetch_leases
+                (channel_id, start_ms, end_ms, owner, expires_ms) VALUES (?, ?, ?, ?, ?)
+                """,
+                (channel_id, start_ts, end_ts, owner, now_ms + ttl_ms),
+            )
+        return True
+
+    def release_lease(
+        self, channel_id: str, start_ts: int, end_ts: int, owner: str
+    ) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM fetch_leases WHERE channel_id = ? AND start_ms = ? AND owner = ?",
+                (channel_id, start_ts, owner),
+            )
@@ -0,0 +1,217 @@
+import asyncio
+import os
+import re
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, List, Optional
+from loguru import logger
+from src.config_loader import Config
+from src.dtos import ConversationContext
+from .read_through_cache import ReadThroughCache
+from .message_serializer import serialize_messages
+from .summarizer import daily_summary_key, summarize_day
+from .summary_cache import SummaryCache
+
+# Plain requests for the summary of a single closed day, in English or Polish.
+# Anything more specific goes through the orchestrator.
+DAY_QUESTION_PATTERN = re.compile(
+    r"^\s*(?:please\s+|prosz[eę]\s+)?"
+    r"(?:summari[sz]e|what\s+happened|what\s+was\s+discussed|podsumuj|"
+    r"co\s+si[eę]\s+dzia[lł]o|co\s+by[lł]o)"
+    r"(?:\s+(?:here|in\s+this\s+channel|tutaj|na\s+kanale))?"
+    r"(?:\s+on)?\s+(?P<day>yesterday|wczoraj|\d{4}-\d{2}-\d{2})\s*[?.!]?\s*$",
+    re.IGNORECASE,
+)
+# Lease of the digest worker in a shared storage, apart from the channels of fetch leases
+DIGEST_LEASE_KEY = "daily-digests"
+
+# The bot mention the frontend leaves at the start of a question, by name or raw id
+BOT_MENTION_PATTERN = re.compile(
+    r"^\s*(?:<@!?\d+>|@?podsumowywator\b)[\s,:;.!-]*", re.IGNORECASE
+)
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _day_range(day: date) -> tuple[str, str]:
+    """The UTC day, the same boundaries the daily summaries are grouped by."""
+    return (
+        f"{day.isoformat()}T00:00:00.000Z",
+        f"{(day + timedelta(days=1)).isoformat()}T00:00:00.000Z",
+    )
+
+
+class DailyDigests:
+    """
+    Digests of closed days of active channels, computed in the background.
+    Days are UTC days, like the current time given to the orchestrator.
+
+    A digest is the memoized daily summary of a channel's day, so digests made
+    here are reused by multi-day summaries and the other way round. Plain
+    questions about a closed day are answered from a digest without running
+    the orchestrator, as long as the day's messages did not change since.
+
+    When workers share the cache storage, a single one of them digests, the one
+    holding the digest lease of the storage.
+    """
+
+    def __init__(
+        self,
+        cache: ReadThroughCache,
+        summary_cache: SummaryCache,
+        config: Config,
+        channels: Callable[[], List[str]],
+        interval_seconds: float = 900,
+        clock: Callable[[], datetime] = _utc_now,
+    ):
+        """
+        Args:
+            cache: The cache the messages are loaded through
+            summary_cache: Where the digests are stored
+            config: Configuration of the summarizer
+            channels: Source of the channels to digest
+            interval_seconds: Time between two digest runs
+            clock: Source of the current time
+        """
+        self.cache = cache
+        self.summary_cache = summary_cache
+        self.config = config
+        self.channels = channels
+        self.interval_seconds = interval_seconds
+        self._now = clock
+        self._task: Optional[asyncio.Task] = None
+        self._lease_owner = f"{os.getpid()}-{uuid.uuid4().hex}"
+
+    def _context(self) -> ConversationContext:
+        return ConversationContext(
+            current_date=self._now()
+            .astimezone(timezone.utc)
+            .strftime("%Y-%m-%d %H:%M:%S"),
+            config=self.config,
+        )
+
+    def _today(self) -> date:
+        return self._now().astimezone(timezone.utc).date()
+
+    def question_day(self, question: str) -> Optional[date]:
+        """The closed day a plain day-scoped question asks about, None otherwise."""
+        match = DAY_QUESTION_PATTERN.match(
+            BOT_MENTION_PATTERN.sub("", question, count=1)
+        )
+        if match is None:
+            return None
+        today = self._today()
+        if match["day"].lower() in ("yesterday", "wczoraj"):
+            return today - timedelta(days=1)
+        try:
+            day = date.fromisoformat(match["day"])
+        except ValueError:
+            return None
+        return day if day < today else None
+
+    async def digest(self, channel_id: str, day: date) -> Optional[str]:
+        """Digest of a channel's day, summarizing it if needed, None without messages."""
+        start_date, end_date = _day_range(day)
+        messages = await self.cache.aload(channel_id, start_date, end_date)
+        if not messages:
+            return None
+        return await summarize_day(
+            self._context(),
+            self.summary_cache,
+            channel_id,
+            day.isoformat(),
+            messages,
+            asyncio.Semaphore(self.config.summarizer_max_concurrency),
+        )
+
+    async def answer(self, channel_id: str, question: str) -> Optional[str]:
+        """
+        Answer a plain question about a closed day from a ready digest.
+        Returns None when the question is not such or no digest is ready.
+        """
+        day = self.question_day(question)
+        if day is None:
+            return None
+        start_date, end_date = _day_range(day)
+        messages = await self.cache.aload(channel_id, start_date, end_date)
+        if not messages:
+            return None
+        key = daily_summary_key(
+            self.config,
+            channel_id,
+            day.isoformat(),
+            serialize_messages(messages).text,
+        )
+        digest = self.summary_cache.get(key)
+        if digest is not None:
+            logger.info(f"Answering from the digest of channel {channel_id} on {day}")
+        return digest
+
+    async def _hold_lease(self) -> bool:
+        """
+        Claim or renew the digest lease when the storage is shared by several workers.
+        The holder renews it before every channel and it outlives two intervals, so
+        another worker only takes over once the holder stopped digesting.
+        """
+        storage = self.cache.storage
+        if storage is None or not storage.shared:
+            return True
+        return await asyncio.to_thread(
+            storage.try_lease,
+            DIGEST_LEASE_KEY,
+            0,
+            1,
+            self._lease_owner,
+            int(2 * self.interval_seconds * 1000),
+        )
+
+    async def run_once(self) -> int:
+        """
+        Digest yesterday of every active channel, unless another worker sharing
+        the storage is the digest worker.
+
+        Returns:
+            Number of channels with a digest
+        """
+        yesterday = self._today() - timedelta(days=1)
+        digested = 0
+        for channel_id in self.channels():
+            if not await self._hold_lease():
+                logger.debug("Another worker holds the digest lease")
+                break
+            try:
+                if await self.digest(channel_id, yesterday) is not None:
+                    digested += 1
+            except Exception as e:
+                logger.warning(
+                    f"Digest of channel {channel_id} on {yesterday} failed: {e!r}"
+                )
+        logger.info(f"Digested {yesterday} of {digested} channels")
+        return digested
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Digest run failed: {str(e)}")
+                logger.exception(e)
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self) -> None:
+        """Start digesting in the background of the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Digesting closed days every {self.interval_seconds} seconds")
+
+    async def stop(self) -> None:
+        """Stop the background task, cancelling a run in progress."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,68 @@
+import json
+from typing import Any, List
+
+
+class JsonArrayParser:
+    """
+    Incremental parser of a top-level JSON array.
+
+    Text is fed in chunks as it arrives from the network and every array item is
+    returned as soon as it is complete, so the raw body is never held in memory
+    as a whole.
+    """
+
+    _WHITESPACE = " \t\n\r"
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        # One of: start, first_value, value, separator, done
+        self._state = "start"
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Add a chunk of text and return the array items completed by it."""
+        self._buffer += chunk
+        items = []
+        pos = 0
+
+        while True:
+            while pos < len(self._buffer) and self._buffer[pos] in self._WHITESPACE:
+                pos += 1
+            if pos >= len(self._buffer):
+                break
+
+            char = self._buffer[pos]
+            if self._state == "start":
+                if char != "[":
+                    raise ValueError(f"Expected a JSON array, got {char!r}")
+                self._state = "first_value"
+                pos += 1
+            elif self._state == "separator":
+                if char == ",":
+                    self._state = "value"
+                elif char == "]":
+                    self._state = "done"
+                else:
+                    raise ValueError(f"Expected ',' or ']' in JSON array, got {char!r}")
+                pos += 1
+            elif self._state == "first_value" and char == "]":
+                self._state = "done"
+                pos += 1
+            elif self._state in ("first_value", "value"):
+                try:
+                    item, pos = self._decoder.raw_decode(self._buffer, pos)
+                except json.JSONDecodeError:
+                    # The item is not complete yet, wait for the next chunk
+                    break
+                items.append(item)
+                self._state = "separator"
+            else:
+                raise ValueError(f"Unexpected data after the JSON array: {char!r}")
+
+        self._buffer = self._buffer[pos:]
+        return items
+
+    def close(self) -> None:
+        """Check that the whole array was received."""
+        if self._state != "done" or self._buffer.strip():
+            raise ValueError("Truncated or malformed JSON array")
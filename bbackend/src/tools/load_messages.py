@@ -4,7 +4,7 @@ from src.dtos import Image, Message
 from loguru import logger
 from src.config_loader import load_config
 from urllib.parse import urljoin
-from src.memory import MessageMemory
+from src.memory import MessageHandle, MessageMemory
 from src.dtos import ConversationContext
 
 
@@ -32,7 +32,7 @@ def get_mocked_messages():
 
 def create_load_messages(cache: ReadThroughCache):
     @function_tool
-    def load_messages(channel_id: str, start_date: str, end_date: str) -> str:
+    async def load_messages(channel_id: str, start_date: str, end_date: str) -> str:
         """Load messages from a specified channel within a given date range and store them in memory.
 
         Args:
@@ -46,12 +46,15 @@ def create_load_messages(cache: ReadThroughCache):
         logger.info(
             f"Loading messages from channel {channel_id} between {start_date} and {end_date}"
         )
-        messages = cache.load(channel_id, start_date, end_date)
+        # Only warm the range here, its messages are built when the handle is resolved
+        count = await cache.awarm(channel_id, start_date, end_date)
         # messages = get_mocked_messages()
-        logger.info(f"Loaded {len(messages)} messages")
+        logger.info(f"Loaded {count} messages")
 
-        # Store messages in memory
-        messages_uuid = MessageMemory.store_messages(messages)
+        # Store a view of the cached range in memory, the messages stay in the cache
+        messages_uuid = MessageMemory.store_messages(
+            MessageHandle(channel_id, start_date, end_date, loader=cache.aload)
+        )
 
         return messages_uuid
 
@@ -0,0 +1,156 @@
+import re
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence
+from src.dtos import Message
+from .cache_index import parse_epoch_ms
+
+# Rough number of characters per token of chat text
+CHARS_PER_TOKEN = 4
+# Consecutive messages of an author within this time are merged into one turn
+MERGE_WINDOW_MS = 5 * 60 * 1000
+# URLs shorter than this cost less written out than in the legend
+MIN_ABBREVIATED_URL_LENGTH = 24
+
+URL_PATTERN = re.compile(r"https?://[^\s<>\"')\]]+")
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+@dataclass
+class SerializedMessages:
+    """Messages rendered for a model input."""
+
+    text: str
+    tokens: int
+    # Number of the oldest messages left out to fit the token budget
+    omitted: int
+
+
+def _shorten(text: str, max_chars: Optional[int]) -> str:
+    if max_chars is not None and len(text) > max_chars:
+        return text[:max_chars] + "…"
+    return text
+
+
+def _message_lines(message: Message, max_chars: Optional[int]) -> List[str]:
+    lines = [_shorten(message.message, max_chars)] if message.message else []
+    if message.images:
+        images = ", ".join(
+            image.url
+            if image.url.lower().endswith("." + image.extension.lower())
+            else f"{image.url} ({image.extension})"
+            for image in message.images
+        )
+        lines.append(f"[images: {images}]")
+    return lines
+
+
+def _render(messages: Sequence[Message], max_chars: Optional[int]) -> str:
+    """
+    Render messages grouped by day, merging consecutive turns of an author
+    and replacing URLs that occur more than once with references to a legend.
+    """
+    bodies = [_message_lines(message, max_chars) for message in messages]
+
+    counts = Counter(
+        url for lines in bodies for line in lines for url in URL_PATTERN.findall(line)
+    )
+    legend = {
+        url: f"[U{number}]"
+        for number, url in enumerate(
+            (
+                url
+                for url, count in counts.items()
+                if count > 1 and len(url) >= MIN_ABBREVIATED_URL_LENGTH
+            ),
+            start=1,
+        )
+    }
+
+    def abbreviate(line: str) -> str:
+        if not legend:
+            return line
+        return URL_PATTERN.sub(lambda match: legend.get(match[0], match[0]), line)
+
+    out = []
+    if legend:
+        out.append("URLs:")
+        out.extend(f"{reference} {url}" for url, reference in legend.items())
+    day = None
+    previous: Optional[tuple[str, int]] = None
+    for message, lines in zip(messages, bodies):
+        ts = parse_epoch_ms(message.created_at)
+        created_at = datetime.fromtimestamp(ts / 1000, timezone.utc)
+        lines = [abbreviate(line) for line in lines] or [""]
+        if created_at.strftime("%Y-%m-%d") != day:
+            day = created_at.strftime("%Y-%m-%d")
+            out.append(f"## {day}")
+            previous = None
+        if (
+            previous is not None
+            and previous[0] == message.username
+            and ts - previous[1] <= MERGE_WINDOW_MS
+        ):
+            out.extend(f"  {line}" for line in lines)
+        else:
+            out.append(f"{created_at:%H:%M} {message.username}: {lines[0]}")
+            out.extend(f"  {line}" for line in lines[1:])
+        previous = (message.username, ts)
+    return "\n".join(out)
+
+
+def message_tokens(message: Message, max_chars: Optional[int] = None) -> int:
+    """Upper bound of the tokens a message takes in the serialized form."""
+    return estimate_tokens(
+        f"00:00 {message.username}: " + "\n  ".join(_message_lines(message, max_chars))
+    )
+
+
+def serialize_messages(
+    messages: Sequence[Message],
+    max_tokens: Optional[int] = None,
+    max_chars_per_message: Optional[int] = None,
+    mark_omitted: bool = True,
+) -> SerializedMessages:
+    """
+    Render messages compactly for a model input.
+
+    Messages are grouped under day headers with HH:MM UTC times, consecutive
+    turns of an author are merged, empty image lists are left out and URLs that
+    repeat are replaced by references to a legend at the top.
+    When max_tokens is given the newest messages that fit are kept and the
+    number of omitted older ones is stated in the first line.
+
+    Args:
+        messages: Messages sorted by time, oldest first
+        max_tokens: Hard budget of the estimated tokens of the result
+        max_chars_per_message: Longer message texts are cut off
+        mark_omitted: Whether to state the number of omitted messages in the text
+    """
+    kept = list(messages)
+    if max_tokens is not None:
+        # Keep the newest messages by their upper bound, then drop more
+        # in the unlikely case headers and the legend do not fit
+        budget = max_tokens
+        start = len(kept)
+        while start > 0:
+            tokens = message_tokens(kept[start - 1], max_chars_per_message)
+            if tokens > budget:
+                break
+            budget -= tokens
+            start -= 1
+        kept = kept[start:]
+
+    while True:
+        omitted = len(messages) - len(kept)
+        text = _render(kept, max_chars_per_message)
+        if omitted and mark_omitted:
+            text = f"[{omitted} earlier messages omitted]\n{text}"
+        tokens = estimate_tokens(text)
+        if max_tokens is None or tokens <= max_tokens or not kept:
+            return SerializedMessages(text=text, tokens=tokens, omitted=omitted)
+        kept = kept[1:]
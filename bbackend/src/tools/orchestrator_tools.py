@@ -1,12 +1,15 @@
 from src.tools.date_processor import date_processor_agent_tool
 from src.tools.read_through_cache import ReadThroughCache
 from src.tools.load_messages import create_load_messages
-from src.tools.summarizer import summarizer_agent_tool
+from src.tools.summarizer import create_summarizer_agent_tool
+from src.tools.summary_cache import SummaryCache
 
 
-def get_orchestrator_tools(cache: ReadThroughCache):
+def get_orchestrator_tools(
+    cache: ReadThroughCache, summary_cache: SummaryCache | None = None
+):
     return [
         create_load_messages(cache),
-        summarizer_agent_tool,
+        create_summarizer_agent_tool(summary_cache),
         date_processor_agent_tool,
     ]
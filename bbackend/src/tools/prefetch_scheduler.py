@@ -0,0 +1,173 @@
+import asyncio
+import math
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+from loguru import logger
+from .cache_index import format_iso_date, to_epoch_ms
+from .read_through_cache import ReadThroughCache
+
+
+def _local_now() -> datetime:
+    return datetime.now().astimezone()
+
+
+class PrefetchScheduler:
+    """
+    Background task keeping the common windows of hot channels warm in the cache.
+
+    Channels are ranked by the number of summary requests they received, decayed
+    exponentially so that yesterday's busy channels cool down. On every run the
+    hottest channels get today, yesterday and the last days loaded through aload,
+    which only fetches what is missing or newer than the live edge.
+    """
+
+    def __init__(
+        self,
+        cache: ReadThroughCache,
+        interval_seconds: float = 300,
+        max_channels: int = 5,
+        max_concurrency: int = 2,
+        lookback_days: int = 7,
+        quiet_hours: Optional[Tuple[int, int]] = None,
+        popularity_half_life_seconds: float = 86400,
+        clock: Callable[[], datetime] = _local_now,
+    ):
+        """
+        Args:
+            cache: The cache to warm up
+            interval_seconds: Time between two prefetch runs
+            max_channels: Number of hottest channels prefetched on every run
+            max_concurrency: Maximum number of windows loaded at the same time
+            lookback_days: Length of the longest prefetched window in days
+            quiet_hours: Local (start, end) hours during which nothing is prefetched,
+                the range may wrap around midnight
+            popularity_half_life_seconds: Time after which a request counts half as much
+            clock: Source of the current local time
+        """
+        self.cache = cache
+        self.interval_seconds = interval_seconds
+        self.max_channels = max_channels
+        self.max_concurrency = max_concurrency
+        self.lookback_days = lookback_days
+        self.quiet_hours = quiet_hours
+        self.popularity_half_life_seconds = popularity_half_life_seconds
+        self._now = clock
+        # Per channel decayed request count and the time it was last updated
+        self._popularity: Dict[str, Tuple[float, float]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _decayed(self, channel_id: str, at: float) -> float:
+        score, updated_at = self._popularity.get(channel_id, (0.0, at))
+        return score * math.pow(
+            0.5, (at - updated_at) / self.popularity_half_life_seconds
+        )
+
+    def record_request(self, channel_id: str) -> None:
+        """Count a summary request of a channel."""
+        at = self._now().timestamp()
+        self._popularity[channel_id] = (self._decayed(channel_id, at) + 1, at)
+
+    def hot_channels(self) -> List[str]:
+        """The channels to prefetch, hottest first."""
+        at = self._now().timestamp()
+        ranked = sorted(
+            self._popularity,
+            key=lambda channel_id: self._decayed(channel_id, at),
+            reverse=True,
+        )
+        return ranked[: self.max_channels]
+
+    def in_quiet_hours(self) -> bool:
+        if self.quiet_hours is None:
+            return False
+        start_hour, end_hour = self.quiet_hours
+        hour = self._now().hour
+        if start_hour <= end_hour:
+            return start_hour <= hour < end_hour
+        return hour >= start_hour or hour < end_hour
+
+    def windows(self) -> List[Tuple[str, str]]:
+        """
+        Today, yesterday and the last lookback_days days, as ISO ranges.
+        Smaller windows come first, so the most asked for ones are warm the soonest.
+        """
+        now = self._now()
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        now_date = format_iso_date(to_epoch_ms(now))
+        return [
+            (format_iso_date(to_epoch_ms(midnight)), now_date),
+            (
+                format_iso_date(to_epoch_ms(midnight - timedelta(days=1))),
+                format_iso_date(to_epoch_ms(midnight)),
+            ),
+            (
+                format_iso_date(
+                    to_epoch_ms(midnight - timedelta(days=self.lookback_days))
+                ),
+                now_date,
+            ),
+        ]
+
+    async def run_once(self) -> int:
+        """
+        Prefetch the windows of the hot channels.
+
+        Returns:
+            Number of windows that were loaded
+        """
+        if self.in_quiet_hours():
+            logger.debug("Skipping prefetch during quiet hours")
+            return 0
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def prefetch_channel(channel_id: str) -> int:
+            loaded = 0
+            # Windows of a channel go in order, later ones reuse what earlier ones cached
+            for start_date, end_date in self.windows():
+                async with semaphore:
+                    try:
+                        await self.cache.aload(channel_id, start_date, end_date)
+                        loaded += 1
+                    except Exception as e:
+                        logger.warning(
+                            f"Prefetch of channel {channel_id} from {start_date} "
+                            f"to {end_date} failed: {e!r}"
+                        )
+            return loaded
+
+        channel_ids = self.hot_channels()
+        results = await asyncio.gather(
+            *(prefetch_channel(channel_id) for channel_id in channel_ids)
+        )
+        logger.info(
+            f"Prefetched {sum(results)} windows of {len(channel_ids)} hot channels"
+        )
+        return sum(results)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Prefetch run failed: {str(e)}")
+                logger.exception(e)
+
+    def start(self) -> None:
+        """Start prefetching in the background of the running event loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info(
+                f"Prefetching hot channels every {self.interval_seconds} seconds"
+            )
+
+    async def stop(self) -> None:
+        """Stop the background task, cancelling a run in progress."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -1,68 +1,356 @@
+import asyncio
 from agents import Agent, Runner, function_tool
-from src.prompts.summarizer_prompt import SUMMARIZER_PROMPT
+from src.prompts.summarizer_prompt import SUMMARIZER_PROMPT, SUMMARIZER_REDUCE_PROMPT
 from loguru import logger
 from src.memory import MessageMemory
-from src.dtos import Message, ConversationContext, Image
+from src.dtos import Message, ConversationContext
+from src.config_loader import Config
 from agents import RunContextWrapper
+from src.tools.cache_index import format_iso_date, parse_epoch_ms
 from src.tools.summarizer_tools import SUMMARIZER_TOOLS
+from src.tools.message_serializer import (
+    estimate_tokens,
+    message_tokens,
+    serialize_messages,
+)
+from src.tools.summary_cache import (
+    SummaryCache,
+    SummaryKey,
+    content_hash,
+    prompt_version,
+)
 
+# A pause this long between two messages is treated as the end of a conversation
+CONVERSATION_GAP_MS = 30 * 60 * 1000
+DAY_MS = 24 * 60 * 60 * 1000
 
-def _images_to_string(images: list[Image]) -> str:
-    return "\n".join(
-        [f"url: {img.url}\nextension: {img.extension}\n" for img in images]
-    )
+MAP_QUERY = (
+    "This is one part of a longer conversation. Summarize it, keeping every detail "
+    "relevant to the following query: {query}"
+)
+# Daily summaries are shared by all queries, so they keep the details any of them may need
+DAILY_QUERY = (
+    "Summarize the conversation of this day. Keep names, decisions, action items, "
+    "deadlines, numbers, links and images, so that later questions about the day "
+    "can be answered from the summary alone. Write it in {main_language}."
+)
+
+
+def _chunk_messages(messages: list[Message], max_tokens: int) -> list[list[Message]]:
+    """
+    Split messages sorted by time into chunks of at most max_tokens.
+    A chunk preferably ends where a conversation does, at the last long pause
+    after the first half of the budget, otherwise right before the budget is exceeded.
+    """
+    chunks: list[list[Message]] = []
+    current: list[Message] = []
+    sizes: list[int] = []
+    current_tokens = 0
+    boundary = None
+    previous_ts = None
+
+    for msg in messages:
+        tokens = message_tokens(msg)
+        ts = parse_epoch_ms(msg.created_at)
+        if (
+            previous_ts is not None
+            and ts - previous_ts >= CONVERSATION_GAP_MS
+            and current_tokens >= max_tokens // 2
+        ):
+            boundary = len(current)
+        if current and current_tokens + tokens > max_tokens:
+            cut = boundary or len(current)
+            chunks.append(current[:cut])
+            current = current[cut:]
+            sizes = sizes[cut:]
+            current_tokens = sum(sizes)
+            boundary = None
+            # The tail after the pause may still leave no room for the message
+            if current and current_tokens + tokens > max_tokens:
+                chunks.append(current)
+                current, sizes, current_tokens = [], [], 0
+        current.append(msg)
+        sizes.append(tokens)
+        current_tokens += tokens
+        previous_ts = ts
 
+    if current:
+        chunks.append(current)
+    return chunks
 
-def _messages_to_string(messages: list[Message]) -> str:
-    return "\n".join(
-        [
-            f"{msg.username}: {msg.message}\n<Message images>\n{_images_to_string(msg.images)}\n</Message images>\n"
-            for msg in messages
-        ]
+
+async def _run_summarizer(
+    context: ConversationContext,
+    instructions: str,
+    input_text: str,
+    with_tools: bool = True,
+) -> str:
+    summarizer_agent = Agent(
+        name="Summarizer",
+        instructions=instructions,
+        model=context.config.summarizer_model,
+        tools=SUMMARIZER_TOOLS if with_tools else [],
     )
+    result = await Runner.run(summarizer_agent, input_text, context=context)
+    return result.final_output
 
 
-@function_tool
-async def summarizer_agent_tool(
-    wrapper_context: RunContextWrapper[ConversationContext],
-    messages_uuid: str,
-    query: str | None = None,
-):
+async def _reduce(
+    context: ConversationContext,
+    partials: list[str],
+    query: str,
+    semaphore: asyncio.Semaphore,
+) -> str:
     """
-    A tool that summarizes the messages and answers to the given query.
-    Can also analyze the images in the messages and the web page content.
-    It works on the messages that are stored in the memory by the load_messages tool.
-
-    Args:
-        messages_uuid: The uuid of the messages to summarize previously loaded by load_messages tool.
-        query: The query that the summarizer should answer to. If None, will summarize the conversation.
-    Returns:
-        The summary of the messages.
+    Combine partial summaries into the answer to the query.
+    While they do not fit the chunk budget together, neighbouring ones are combined
+    in groups first, so every reduce call stays within the budget.
     """
-    # Retrieve messages from memory
-    messages = MessageMemory.get_messages(messages_uuid)
+    max_tokens = context.config.summarizer_chunk_tokens
+    while len(partials) > 1 and estimate_tokens("\n\n".join(partials)) > max_tokens:
+        groups: list[list[str]] = [[]]
+        group_tokens = 0
+        for partial in partials:
+            tokens = estimate_tokens(partial)
+            if groups[-1] and group_tokens + tokens > max_tokens:
+                groups.append([])
+                group_tokens = 0
+            groups[-1].append(partial)
+            group_tokens += tokens
+        if len(groups) == len(partials):
+            # Every partial fills the budget alone, combining further cannot help
+            break
 
-    summarizer_agent = Agent(
-        name="Summarizer",
-        instructions=SUMMARIZER_PROMPT,
-        model=wrapper_context.context.config.summarizer_model,
-        tools=SUMMARIZER_TOOLS,
+        async def combine(group: list[str]) -> str:
+            if len(group) == 1:
+                return group[0]
+            async with semaphore:
+                summary = await _run_summarizer(
+                    context,
+                    SUMMARIZER_REDUCE_PROMPT,
+                    "Partial summaries:\n"
+                    + "\n\n".join(group)
+                    + f"\n\nQuery: {MAP_QUERY.format(query=query)}",
+                    with_tools=False,
+                )
+            return summary
+
+        logger.info(
+            f"Combining {len(partials)} partial summaries in {len(groups)} groups"
+        )
+        partials = await asyncio.gather(*(combine(group) for group in groups))
+
+    async with semaphore:
+        return await _run_summarizer(
+            context,
+            SUMMARIZER_REDUCE_PROMPT,
+            "Partial summaries:\n" + "\n\n".join(partials) + f"\n\nQuery: {query}",
+            with_tools=False,
+        )
+
+
+async def _map_reduce(
+    context: ConversationContext,
+    messages: list[Message],
+    query: str,
+    semaphore: asyncio.Semaphore | None = None,
+) -> str:
+    """
+    Summarize chunks of the messages concurrently, then reduce them to one answer.
+    Callers running several map-reduces at once pass one semaphore bounding all of them.
+    """
+    chunks = _chunk_messages(messages, context.config.summarizer_chunk_tokens)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(context.config.summarizer_max_concurrency)
+    logger.info(f"Summarizing {len(messages)} messages in {len(chunks)} chunks")
+
+    async def summarize_chunk(chunk: list[Message]) -> str:
+        # Chunks are already cut to the budget
+        serialized = serialize_messages(chunk)
+        async with semaphore:
+            summary = await _run_summarizer(
+                context,
+                SUMMARIZER_PROMPT,
+                f"Messages:\n{serialized.text}\n\n"
+                f"Query: {MAP_QUERY.format(query=query)}",
+            )
+        return (
+            f"Messages from {chunk[0].created_at} to {chunk[-1].created_at}:\n{summary}"
+        )
+
+    partials = await asyncio.gather(*(summarize_chunk(chunk) for chunk in chunks))
+    return await _reduce(context, list(partials), query, semaphore)
+
+
+def _is_wide_window(
+    start_date: str, end_date: str, tokens: int, config: Config
+) -> bool:
+    """
+    Whether a window is worth composing from daily summaries: it does not fit the
+    chunk budget, or it contains a whole UTC day. Narrow windows crossing midnight
+    are summarized in one run, with the tools and the actual query.
+    """
+    if tokens > config.summarizer_chunk_tokens:
+        return True
+    first_midnight = -(-parse_epoch_ms(start_date) // DAY_MS) * DAY_MS
+    return first_midnight + DAY_MS <= parse_epoch_ms(end_date)
+
+
+def _group_by_day(messages: list[Message]) -> dict[str, list[Message]]:
+    """Group messages sorted by time by their UTC day."""
+    days: dict[str, list[Message]] = {}
+    for msg in messages:
+        day = format_iso_date(parse_epoch_ms(msg.created_at))[:10]
+        days.setdefault(day, []).append(msg)
+    return days
+
+
+def daily_summary_key(
+    config: Config, channel_id: str, day: str, serialized_text: str
+) -> SummaryKey:
+    """Key of the daily summary of the given serialized messages of a day."""
+    return SummaryKey(
+        channel_id=channel_id,
+        day=day,
+        content_hash=content_hash(serialized_text),
+        model=config.summarizer_model,
+        prompt_version=prompt_version(
+            SUMMARIZER_PROMPT + DAILY_QUERY.format(main_language=config.main_language)
+        ),
     )
 
-    messages_string = _messages_to_string(messages)
-    if query is None:
-        query = "Summarize the conversation"
 
-    logger.info(f"Summarizer tool query: {query}")
-    logger.info(f"Summarizer tool messages: {messages_string}")
+async def summarize_day(
+    context: ConversationContext,
+    summary_cache: SummaryCache,
+    channel_id: str,
+    day: str,
+    day_messages: list[Message],
+    semaphore: asyncio.Semaphore,
+) -> str:
+    """Summary of the messages of a day, from the cache when they did not change."""
+    config = context.config
+    serialized = serialize_messages(day_messages)
+    query = DAILY_QUERY.format(main_language=config.main_language)
+
+    async def summarize() -> str:
+        logger.info(f"Summarizing {len(day_messages)} messages of {day}")
+        if serialized.tokens > config.summarizer_chunk_tokens:
+            return await _map_reduce(context, day_messages, query, semaphore)
+        async with semaphore:
+            return await _run_summarizer(
+                context,
+                SUMMARIZER_PROMPT,
+                f"Messages:\n{serialized.text}\n\nQuery: {query}",
+            )
+
+    key = daily_summary_key(config, channel_id, day, serialized.text)
+    return await summary_cache.get_or_create(key, summarize)
 
-    input_text = f"Messages:\n{messages_string}\n\nQuery: {query}"
 
-    result = await Runner.run(
-        summarizer_agent,
-        input_text,
-        context=wrapper_context.context,
+async def _summarize_by_day(
+    context: ConversationContext,
+    summary_cache: SummaryCache,
+    channel_id: str,
+    messages: list[Message],
+    query: str,
+) -> str:
+    """
+    Answer the query from daily summaries of the messages.
+    Days summarized before with the same content come from the cache,
+    only the others are summarized, concurrently.
+    """
+    semaphore = asyncio.Semaphore(context.config.summarizer_max_concurrency)
+
+    async def day_partial(day: str, day_messages: list[Message]) -> str:
+        summary = await summarize_day(
+            context, summary_cache, channel_id, day, day_messages, semaphore
+        )
+        return f"Messages of {day}:\n{summary}"
+
+    days = _group_by_day(messages)
+    partials = await asyncio.gather(
+        *(day_partial(day, day_messages) for day, day_messages in days.items())
+    )
+    logger.info(
+        f"Summary cache after summarizing {len(days)} days: {summary_cache.to_dict()}"
     )
+    return await _reduce(context, list(partials), query, semaphore)
 
-    logger.info(f"Summarizer agent result: {result.final_output}")
-    return result.final_output
+
+def create_summarizer_agent_tool(summary_cache: SummaryCache | None = None):
+    @function_tool
+    async def summarizer_agent_tool(
+        wrapper_context: RunContextWrapper[ConversationContext],
+        messages_uuid: str,
+        query: str | None = None,
+    ):
+        """
+        A tool that summarizes the messages and answers to the given query.
+        Can also analyze the images in the messages and the web page content.
+        It works on the messages that are stored in the memory by the load_messages tool.
+
+        Args:
+            messages_uuid: The uuid of the messages to summarize previously loaded by load_messages tool.
+            query: The query that the summarizer should answer to. If None, will summarize the conversation.
+        Returns:
+            The summary of the messages.
+        """
+        # Retrieve messages from memory
+        handle = MessageMemory.get_handle(messages_uuid)
+        messages = await MessageMemory.get_messages(messages_uuid)
+
+        config = wrapper_context.context.config
+        if query is None:
+            query = "Summarize the conversation"
+
+        logger.info(f"Summarizer tool query: {query}")
+
+        # Beyond the input budget only the newest messages are summarized
+        serialized = serialize_messages(
+            messages, max_tokens=config.summarizer_max_input_tokens
+        )
+        if serialized.omitted:
+            logger.warning(
+                f"Summarizing the newest {len(messages) - serialized.omitted} of "
+                f"{len(messages)} messages within {config.summarizer_max_input_tokens} tokens"
+            )
+            messages = messages[serialized.omitted :]
+
+        # Wide windows over several days are composed from memoized daily summaries
+        if (
+            summary_cache is not None
+            and len(_group_by_day(messages)) > 1
+            and _is_wide_window(
+                handle.start_date, handle.end_date, serialized.tokens, config
+            )
+        ):
+            result = await _summarize_by_day(
+                wrapper_context.context,
+                summary_cache,
+                handle.channel_id,
+                messages,
+                query,
+            )
+            logger.info(f"Summarizer daily result: {result}")
+            return result
+
+        # Windows over the chunk budget are summarized in chunks and reduced
+        if serialized.tokens > config.summarizer_chunk_tokens:
+            result = await _map_reduce(wrapper_context.context, messages, query)
+            logger.info(f"Summarizer map-reduce result: {result}")
+            return result
+
+        messages_string = serialized.text
+        logger.info(f"Summarizer tool messages: {messages_string}")
+
+        input_text = f"Messages:\n{messages_string}\n\nQuery: {query}"
+
+        result = await _run_summarizer(
+            wrapper_context.context, SUMMARIZER_PROMPT, input_text
+        )
+
+        logger.info(f"Summarizer agent result: {result}")
+        return result
+
+    return summarizer_agent_tool
@@ -0,0 +1,120 @@
+import asyncio
+import hashlib
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict
+from loguru import logger
+from src.memory import BoundedStore
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def prompt_version(prompt: str) -> str:
+    """Short hash of a prompt, so that editing the prompt invalidates its summaries."""
+    return content_hash(prompt)[:12]
+
+
+@dataclass(frozen=True)
+class SummaryKey:
+    channel_id: str
+    # UTC day in YYYY-MM-DD format
+    day: str
+    # Hash of the serialized messages of the day that were summarized
+    content_hash: str
+    model: str
+    prompt_version: str
+
+    def __str__(self) -> str:
+        return "|".join(
+            [
+                self.channel_id,
+                self.day,
+                self.content_hash,
+                self.model,
+                self.prompt_version,
+            ]
+        )
+
+
+class SummaryCache:
+    """
+    Memoized daily summaries of channels.
+
+    A summary is only reused for exactly the content it was made from, so days
+    that received new messages, or were only partly covered by a window, miss
+    and get summarized again. Concurrent requests for the same key share one run.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self._summaries: BoundedStore[str] = BoundedStore(ttl_seconds, max_entries)
+        self._inflight: Dict[SummaryKey, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._summaries)
+
+    def get(self, key: SummaryKey) -> str | None:
+        try:
+            return self._summaries.get(str(key))
+        except KeyError:
+            return None
+
+    def put(self, key: SummaryKey, summary: str) -> None:
+        self._summaries.put(str(key), summary)
+
+    def clear(self) -> None:
+        self._summaries.clear()
+
+    async def get_or_create(
+        self, key: SummaryKey, summarize: Callable[[], Awaitable[str]]
+    ) -> str:
+        """
+        Return the summary of a key, summarizing once if it is not cached.
+        When the request summarizing a key is cancelled, a waiting one takes over.
+        """
+        while True:
+            summary = self.get(key)
+            if summary is not None:
+                self.hits += 1
+                logger.debug(f"Summary cache hit for {key.channel_id} on {key.day}")
+                return summary
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            # Waiting does not propagate the cancellation of the owner
+            await asyncio.wait([inflight])
+            if not inflight.cancelled():
+                self.hits += 1
+                return inflight.result()
+            logger.debug(f"Taking over the summary of {key.channel_id} on {key.day}")
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            summary = await summarize()
+            self.put(key, summary)
+            future.set_result(summary)
+            return summary
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters get the error, nobody else has to retrieve it
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def to_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,314 @@
+import asyncio
+import gzip
+import json
+import zlib
+from dataclasses import replace
+from unittest.mock import AsyncMock, patch
+
+from src.config_loader import load_config
+from src.dtos import Message
+from src.tools.read_through_cache import ReadThroughCache
+
+# main builds its globals on import, they must not open the cache database of the app
+with patch(
+    "src.config_loader.load_config",
+    lambda: replace(load_config(), cache_db_path=None),
+):
+    import main
+
+
+def _request_body(channel_id: str, question: str, thread_id: str = "thread") -> dict:
+    return {
+        "messages": [
+            {
+                "username": "User1",
+                "message": question,
+                "images": [],
+                "createdAt": "2025-04-26T10:00:00.000Z",
+            }
+        ],
+        "channelId": channel_id,
+        "threadId": thread_id,
+    }
+
+
+async def _call(method: str, path: str, body: dict | None, on_body, query: str = ""):
+    """
+    Call the app directly over ASGI, so the test sees each chunk as it is sent.
+    on_body gets the response headers and every body chunk, and returns True
+    to disconnect the client.
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"accept-encoding", b"gzip, deflate"),
+        ],
+        "client": ("testclient", 50000),
+        "server": ("testserver", 80),
+    }
+    request_body = json.dumps(body).encode() if body is not None else b""
+    disconnected = asyncio.Event()
+    received = False
+    headers: dict[str, str] = {}
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": request_body, "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            headers.update(
+                (name.decode().lower(), value.decode())
+                for name, value in message["headers"]
+            )
+        elif message["type"] == "http.response.body":
+            if on_body(headers, message.get("body", b"")):
+                disconnected.set()
+
+    await asyncio.wait_for(main.app(scope, receive, send), timeout=5)
+    return headers
+
+
+def _batch_body(*requests: tuple[str, str]) -> dict:
+    return {
+        "requests": [
+            _request_body(channel_id, question, thread_id=f"thread-{index}")
+            for index, (channel_id, question) in enumerate(requests)
+        ]
+    }
+
+
+def _collect_lines(lines: list[dict], disconnect_after: int | None = None):
+    """Body callback parsing NDJSON lines, disconnecting after some of them."""
+    buffer = bytearray()
+
+    def on_body(headers, chunk):
+        buffer.extend(chunk)
+        while b"\n" in buffer:
+            line, _, rest = bytes(buffer).partition(b"\n")
+            buffer[:] = rest
+            lines.append(json.loads(line))
+        return disconnect_after is not None and len(lines) >= disconnect_after
+
+    return on_body
+
+
+class TestApi:
+    """Test cases for the streaming endpoints of the API."""
+
+    def test_events_are_streamed_one_by_one_with_gzip_accepted(self):
+        """Test that every SSE event reaches the client before the next one exists."""
+        release = asyncio.Event()
+
+        async def stream_summary(request, thread_update):
+            yield "delta", {"text": "Nothing "}
+            # The next event only exists once the client has read the first one
+            await release.wait()
+            yield "final", {"message": "Nothing happened"}
+
+        received = []
+
+        def on_body(headers, chunk):
+            received.append(chunk)
+            if b"event: delta" in b"".join(received):
+                release.set()
+            return False
+
+        async def run():
+            with (
+                patch.object(main.orchestrator_agent, "stream_summary", stream_summary),
+                patch("main._digest_answer", AsyncMock(return_value=None)),
+            ):
+                return await _call(
+                    "POST",
+                    "/ruchniecie/stream",
+                    _request_body("stream-channel", "What happened?"),
+                    on_body,
+                )
+
+        headers = asyncio.run(run())
+
+        assert headers["content-type"].startswith("text/event-stream")
+        assert "content-encoding" not in headers
+        events = b"".join(received).decode()
+        assert events.index("event: delta") < events.index("event: final")
+        assert "Nothing happened" in events
+
+    def test_export_is_gzipped_when_accepted(self):
+        """Test that the cache export is compressed and decodes to NDJSON lines."""
+        cache = ReadThroughCache()
+        cache._merge_touching_ranges(
+            "export-channel",
+            "2025-04-01T00:00:00.000Z",
+            "2025-04-03T00:00:00.000Z",
+            [
+                Message(
+                    username="User1",
+                    message=f"Message {day}",
+                    images=[],
+                    createdAt=f"2025-04-0{day}T10:00:00.000Z",
+                )
+                for day in (1, 2)
+            ],
+        )
+        received = []
+
+        def on_body(headers, chunk):
+            received.append(chunk)
+            return False
+
+        with patch("main.cache", cache):
+            headers = asyncio.run(
+                _call(
+                    "GET",
+                    "/cache/export",
+                    None,
+                    on_body,
+                    query="channel_id=export-channel",
+                )
+            )
+
+        assert headers["content-encoding"] == "gzip"
+        # Every chunk but the trailer is flushed, so it decodes on its own
+        assert zlib.decompressobj(wbits=zlib.MAX_WBITS | 16).decompress(received[0])
+        lines = gzip.decompress(b"".join(received)).decode().splitlines()
+        assert [json.loads(line)["message"] for line in lines] == [
+            "Message 1",
+            "Message 2",
+        ]
+
+    def test_batch_runs_channels_concurrently_and_each_channel_in_order(self):
+        """Test the grouping by channel and the concurrency limit of a batch."""
+        running: dict[str, int] = {}
+        max_running = 0
+        started: list[tuple[str, str]] = []
+
+        async def summarize_request(request):
+            nonlocal max_running
+            question = request.messages[-1].message
+            # Requests of one channel never overlap
+            assert request.channel_id not in running
+            running[request.channel_id] = 1
+            max_running = max(max_running, len(running))
+            started.append((request.channel_id, question))
+            await asyncio.sleep(0.01)
+            del running[request.channel_id]
+            return {"message": f"Answer to {question}"}
+
+        lines: list[dict] = []
+
+        async def run():
+            with (
+                patch("main._summarize_request", summarize_request),
+                patch.object(main.config, "batch_max_concurrency", 2),
+            ):
+                return await _call(
+                    "POST",
+                    "/ruchniecie/batch",
+                    _batch_body(
+                        ("channel-a", "q0"),
+                        ("channel-b", "q1"),
+                        ("channel-a", "q2"),
+                        ("channel-c", "q3"),
+                        ("channel-b", "q4"),
+                    ),
+                    _collect_lines(lines),
+                )
+
+        headers = asyncio.run(run())
+
+        assert headers["content-type"] == "application/x-ndjson"
+        assert "content-encoding" not in headers
+        assert max_running == 2
+        assert [q for channel, q in started if channel == "channel-a"] == ["q0", "q2"]
+        assert [q for channel, q in started if channel == "channel-b"] == ["q1", "q4"]
+        assert sorted(lines, key=lambda line: line["index"]) == [
+            {
+                "index": index,
+                "channelId": channel_id,
+                "threadId": f"thread-{index}",
+                "message": f"Answer to q{index}",
+            }
+            for index, channel_id in enumerate(
+                ["channel-a", "channel-b", "channel-a", "channel-c", "channel-b"]
+            )
+        ]
+
+    def test_batch_reports_a_failed_request_on_its_line(self):
+        """Test that a failing request yields an error line and the others still run."""
+
+        async def summarize_request(request):
+            question = request.messages[-1].message
+            if question == "q1":
+                raise RuntimeError("Upstream unavailable")
+            return {"message": f"Answer to {question}"}
+
+        lines: list[dict] = []
+
+        async def run():
+            with patch("main._summarize_request", summarize_request):
+                await _call(
+                    "POST",
+                    "/ruchniecie/batch",
+                    _batch_body(
+                        ("channel-a", "q0"), ("channel-a", "q1"), ("channel-a", "q2")
+                    ),
+                    _collect_lines(lines),
+                )
+
+        asyncio.run(run())
+
+        assert [line["index"] for line in lines] == [0, 1, 2]
+        assert lines[1]["error"] == "Upstream unavailable"
+        assert "message" not in lines[1]
+        assert [lines[0]["message"], lines[2]["message"]] == [
+            "Answer to q0",
+            "Answer to q2",
+        ]
+
+    def test_batch_is_cancelled_when_the_client_disconnects(self):
+        """Test that requests still running are cancelled once the client is gone."""
+        cancelled: list[str] = []
+
+        async def summarize_request(request):
+            question = request.messages[-1].message
+            if question == "q0":
+                return {"message": "Answer to q0"}
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.append(question)
+                raise
+
+        lines: list[dict] = []
+
+        async def run():
+            with patch("main._summarize_request", summarize_request):
+                await _call(
+                    "POST",
+                    "/ruchniecie/batch",
+                    _batch_body(
+                        ("channel-a", "q0"), ("channel-b", "q1"), ("channel-c", "q2")
+                    ),
+                    _collect_lines(lines, disconnect_after=1),
+                )
+                # Let the cancelled tasks run up to their handlers
+                await asyncio.sleep(0)
+            # Checked before asyncio.run cancels whatever is left
+            return sorted(cancelled)
+
+        assert asyncio.run(run()) == ["q1", "q2"]
+        assert [line["index"] for line in lines] == [0]
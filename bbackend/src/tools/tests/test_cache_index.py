@@ -0,0 +1,212 @@
+import json
+
+from src.dtos import Message
+from src.tools.upstream_client import parse_messages
+from src.tools.cache_index import (
+    EMPTY_IMAGES,
+    CacheEntry,
+    CachedMessage,
+    ChannelIndex,
+    format_iso_date,
+    parse_epoch_ms,
+)
+
+
+def _entry(start: str, end: str, messages: list[Message] | None = None) -> CacheEntry:
+    return CacheEntry.create(parse_epoch_ms(start), parse_epoch_ms(end), messages or [])
+
+
+def _message(username: str, message: str, created_at: str, id: str | None = None):
+    return Message(
+        id=id, username=username, message=message, images=[], createdAt=created_at
+    )
+
+
+class TestChannelIndex:
+    """Test cases for the ChannelIndex class."""
+
+    def test_insert_keeps_entries_sorted(self):
+        """Test that disjoint entries are kept sorted regardless of insert order."""
+        index = ChannelIndex()
+        index.insert(_entry("2025-04-10", "2025-04-11"))
+        index.insert(_entry("2025-04-01", "2025-04-02"))
+        index.insert(_entry("2025-04-05", "2025-04-06"))
+
+        assert [entry.range.start for entry in index] == [
+            "2025-04-01T00:00:00.000Z",
+            "2025-04-05T00:00:00.000Z",
+            "2025-04-10T00:00:00.000Z",
+        ]
+
+    def test_insert_merges_touching_neighbours(self):
+        """Test that an entry bridging two neighbours closes the gap between them."""
+        index = ChannelIndex()
+        index.insert(_entry("2025-04-01", "2025-04-03"))
+        index.insert(_entry("2025-04-06", "2025-04-10"))
+        index.insert(_entry("2025-04-20", "2025-04-21"))
+
+        blocks = index.insert(_entry("2025-04-03", "2025-04-06"))
+
+        # Only the touching blocks are rebuilt, the older ones stay as they were
+        assert [block.range.start[:10] for block in blocks] == [
+            f"2025-04-{day:02}" for day in range(2, 7)
+        ]
+        assert [entry.range.start[:10] for entry in index] == [
+            f"2025-04-{day:02}" for day in range(1, 10)
+        ] + ["2025-04-20"]
+        assert index[8].range.end == "2025-04-10T00:00:00.000Z"
+
+    def test_merged_ranges_are_split_into_day_blocks(self):
+        """Test that merged ranges are split at UTC midnight with their messages."""
+        index = ChannelIndex()
+        index.insert(
+            _entry(
+                "2025-04-01T12:00:00.000Z",
+                "2025-04-02T00:00:00.000Z",
+                [_message("User1", "Noon", "2025-04-01T12:00:00.000Z")],
+            )
+        )
+
+        blocks = index.insert(
+            _entry(
+                "2025-04-02T00:00:00.000Z",
+                "2025-04-03T06:00:00.000Z",
+                [
+                    _message("User2", "Midnight", "2025-04-02T00:00:00.000Z"),
+                    _message("User3", "Last", "2025-04-03T06:00:00.000Z"),
+                ],
+            )
+        )
+
+        assert [(block.range.start, block.range.end) for block in blocks] == [
+            ("2025-04-01T12:00:00.000Z", "2025-04-02T00:00:00.000Z"),
+            ("2025-04-02T00:00:00.000Z", "2025-04-03T00:00:00.000Z"),
+            ("2025-04-03T00:00:00.000Z", "2025-04-03T06:00:00.000Z"),
+        ]
+        assert [[msg.message for msg in block.messages] for block in blocks] == [
+            ["Noon"],
+            ["Midnight"],
+            ["Last"],
+        ]
+        assert index.size_bytes == sum(block.size_bytes for block in blocks)
+
+    def test_find_covering_and_gaps(self):
+        """Test covering lookups and gap calculation around cached ranges."""
+        index = ChannelIndex()
+        index.insert(_entry("2025-04-02", "2025-04-03"))
+        index.insert(_entry("2025-04-05", "2025-04-06"))
+        index.insert(_entry("2025-04-06", "2025-04-07"))
+
+        start = parse_epoch_ms("2025-04-01")
+        end = parse_epoch_ms("2025-04-07")
+
+        assert index.find_covering(start, end) is None
+        assert index.find_covering(
+            parse_epoch_ms("2025-04-02T10:00:00Z"),
+            parse_epoch_ms("2025-04-02T12:00:00Z"),
+        ) == [index[0]]
+        assert index.find_covering(
+            parse_epoch_ms("2025-04-05T10:00:00Z"),
+            parse_epoch_ms("2025-04-06T12:00:00Z"),
+        ) == [index[1], index[2]]
+        assert len(index.find_overlapping(start, end)) == 3
+
+        gaps = [
+            (format_iso_date(gap_start), format_iso_date(gap_end))
+            for gap_start, gap_end in index.find_gaps(start, end)
+        ]
+        assert gaps == [
+            ("2025-04-01T00:00:00.000Z", "2025-04-02T00:00:00.000Z"),
+            ("2025-04-03T00:00:00.000Z", "2025-04-05T00:00:00.000Z"),
+        ]
+
+    def test_repeated_messages_are_kept(self):
+        """Test that identical content sent at different times is not deduplicated."""
+        index = ChannelIndex()
+        index.insert(
+            _entry(
+                "2025-04-01",
+                "2025-04-02",
+                [
+                    _message("User1", "ok", "2025-04-01T10:00:00.000Z"),
+                    _message("User1", "ok", "2025-04-01T11:00:00.000Z"),
+                ],
+            )
+        )
+
+        assert [msg.created_at for msg in index[0].messages] == [
+            "2025-04-01T10:00:00.000Z",
+            "2025-04-01T11:00:00.000Z",
+        ]
+
+    def test_known_messages_are_dropped_on_insert(self):
+        """Test that messages already cached for the channel are not added again."""
+        index = ChannelIndex()
+        index.insert(
+            _entry(
+                "2025-04-01",
+                "2025-04-02",
+                [_message("User1", "+1", "2025-04-01T23:59:59.500Z", id="1")],
+            )
+        )
+
+        blocks = index.insert(
+            _entry(
+                "2025-04-02",
+                "2025-04-03",
+                [
+                    _message("User1", "+1", "2025-04-01T23:59:59.500Z", id="1"),
+                    _message("User2", "+1", "2025-04-02T10:00:00.000Z", id="2"),
+                ],
+            )
+        )
+
+        assert len(index) == 2
+        assert [[msg.id for msg in block.messages] for block in blocks] == [
+            ["1"],
+            ["2"],
+        ]
+        assert all(list(b.timestamps) == sorted(b.timestamps) for b in blocks)
+
+    def test_cached_messages_are_compact_and_convert_back(self):
+        """Test the compact cached form and its conversion back to the DTO."""
+        with_image = Message(
+            username="User" + "1",
+            message="Look",
+            images=[{"url": "image-url", "extension": "png"}],
+            createdAt="2025-04-01T10:00:00.250Z",
+        )
+        entry = _entry(
+            "2025-04-01",
+            "2025-04-02",
+            [
+                with_image,
+                _message("".join(["User", "1"]), "Hi", "2025-04-01T09:00:00Z"),
+            ],
+        )
+
+        first, second = entry.messages
+        assert isinstance(first, CachedMessage)
+        assert first.username is second.username
+        assert first.images is EMPTY_IMAGES
+        assert second.created_at_ms == parse_epoch_ms("2025-04-01T10:00:00.250Z")
+
+        message = second.to_message()
+        assert message == with_image
+        assert message.created_at == "2025-04-01T10:00:00.250Z"
+        assert first.to_message().created_at == "2025-04-01T09:00:00.000Z"
+
+    def test_decoded_upstream_records_intern_repeated_strings(self):
+        """Test that usernames and image extensions decoded in bulk are shared."""
+        body = (
+            '[{"username": "User1", "message": "a", "createdAt": "2025-04-01T09:00:00Z",'
+            ' "images": [{"url": "one", "extension": "png"}]},'
+            ' {"username": "User1", "message": "b", "createdAt": "2025-04-01T09:01:00Z",'
+            ' "images": [{"url": "two", "extension": "png"}]}]'
+        )
+
+        # Values parsed by json are separate strings, unlike pydantic's cached ones
+        first, second = parse_messages(json.loads(body))
+
+        assert first.username is second.username
+        assert first.images[0][1] is second.images[0][1]
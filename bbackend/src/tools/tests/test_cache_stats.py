@@ -0,0 +1,74 @@
+import asyncio
+
+from src.tools.cache_stats import CacheStats
+from .test_read_through_cache_async import MockApi
+
+
+class TestCacheStats:
+    """Test cases for the CacheStats collected by ReadThroughCache."""
+
+    def test_loads_are_classified_and_counted(self):
+        """Test that misses, partial hits and full hits are counted with the fetched volume."""
+        api = MockApi(
+            [
+                {
+                    "username": "User1",
+                    "message": "Hello",
+                    "images": [],
+                    "createdAt": "2025-04-01T10:00:00.000Z",
+                }
+            ]
+        )
+        cache = api.cache()
+        channel_id = "test-channel"
+
+        async def run():
+            await cache.aload(
+                channel_id, "2025-04-01T00:00:00.000Z", "2025-04-02T00:00:00.000Z"
+            )
+            await cache.aload(
+                channel_id, "2025-04-01T06:00:00.000Z", "2025-04-01T12:00:00.000Z"
+            )
+            await cache.aload(
+                channel_id, "2025-04-01T12:00:00.000Z", "2025-04-03T00:00:00.000Z"
+            )
+            await cache.client.aclose()
+
+        asyncio.run(run())
+
+        stats = cache.stats.channel(channel_id)
+        assert (stats.misses, stats.full_hits, stats.partial_hits) == (1, 1, 1)
+        assert stats.fetched_ranges == 2
+        assert stats.fetched_messages == 1
+        assert stats.fetched_bytes == api.sent_bytes
+        assert stats.load_latency.count == 3
+        assert stats.upstream_latency.count == 2
+        assert cache.stats.totals()["hit_ratio"] == 1 / 3
+
+    def test_prometheus_rendering(self):
+        """Test the text exposition of counters, histograms and gauges."""
+        stats = CacheStats()
+        stats.channel('chan"1').misses += 1
+        stats.channel('chan"1').load_latency.observe(0.2)
+
+        text = stats.to_prometheus(
+            {"size_bytes": ("Cache size.", 42)},
+            counters={"evicted_bytes_total": ("Evicted bytes.", 7)},
+        )
+
+        assert (
+            'podsumowywator_cache_lookups_total{channel="chan\\"1",result="miss"} 1'
+            in text
+        )
+        assert (
+            'podsumowywator_cache_load_seconds_bucket{channel="chan\\"1",le="0.1"} 0'
+            in text
+        )
+        assert (
+            'podsumowywator_cache_load_seconds_bucket{channel="chan\\"1",le="0.25"} 1'
+            in text
+        )
+        assert "# TYPE podsumowywator_cache_size_bytes gauge" in text
+        assert "# TYPE podsumowywator_cache_evicted_bytes_total counter" in text
+        assert "podsumowywator_cache_evicted_bytes_total 7" in text
+        assert "podsumowywator_cache_size_bytes 42" in text
@@ -0,0 +1,160 @@
+import asyncio
+
+from src.tools.cache_index import parse_epoch_ms
+from src.tools.cache_storage import SQLiteCacheStorage
+from .test_read_through_cache_async import MockApi
+
+
+class TestSQLiteCacheStorage:
+    """Test cases for the SQLite storage tier of ReadThroughCache."""
+
+    def test_restarted_cache_is_served_from_storage(self, tmp_path):
+        """Test that a new cache over the same database does not call the API."""
+        api = MockApi(
+            [
+                {
+                    "username": "TestUser1",
+                    "message": "Test message 1",
+                    "images": [{"url": "image-url", "extension": "png"}],
+                    "createdAt": "2023-01-01T10:00:00.000Z",
+                },
+                {
+                    "username": "TestUser2",
+                    "message": "Test message 2",
+                    "images": [],
+                    "createdAt": "2023-01-02T11:00:00.000Z",
+                },
+            ]
+        )
+
+        db_path = tmp_path / "cache.sqlite3"
+        channel_id = "test-channel"
+        start_date = "2023-01-01T00:00:00.000Z"
+        end_date = "2023-01-10T00:00:00.000Z"
+
+        asyncio.run(
+            api.cache(storage=SQLiteCacheStorage(db_path)).aload(
+                channel_id, start_date, end_date
+            )
+        )
+        assert len(api.calls) == 1
+
+        restarted = api.cache(storage=SQLiteCacheStorage(db_path))
+        messages = asyncio.run(
+            restarted.aload(
+                channel_id, "2023-01-01T00:00:00.000Z", "2023-01-02T00:00:00.000Z"
+            )
+        )
+
+        assert len(api.calls) == 1
+        assert len(messages) == 1
+        assert messages[0].username == "TestUser1"
+        assert messages[0].images[0].url == "image-url"
+
+    def test_only_ranges_missing_from_storage_are_fetched(self, tmp_path):
+        """Test that the API is only asked for the part the storage does not cover."""
+        api = MockApi([])
+        storage = SQLiteCacheStorage(tmp_path / "cache.sqlite3")
+        channel_id = "test-channel"
+        storage.store(
+            channel_id,
+            parse_epoch_ms("2025-04-03T00:00:00.000Z"),
+            parse_epoch_ms("2025-04-06T00:00:00.000Z"),
+            [],
+        )
+
+        asyncio.run(
+            api.cache(storage=storage).aload(
+                channel_id, "2025-04-01T00:00:00.000Z", "2025-04-05T00:00:00.000Z"
+            )
+        )
+
+        assert api.calls == [
+            {
+                "channelId": channel_id,
+                "startDate": "2025-04-01T00:00:00.000Z",
+                "endDate": "2025-04-03T00:00:00.000Z",
+            }
+        ]
+        assert storage.find_covered(
+            channel_id,
+            parse_epoch_ms("2025-04-01T00:00:00.000Z"),
+            parse_epoch_ms("2025-04-06T00:00:00.000Z"),
+        ) == [
+            (
+                parse_epoch_ms("2025-04-01T00:00:00.000Z"),
+                parse_epoch_ms("2025-04-06T00:00:00.000Z"),
+            )
+        ]
+
+    def test_fetch_leases_are_exclusive(self, tmp_path):
+        """Test that overlapping leases of other owners are refused until released."""
+        db_path = tmp_path / "cache.sqlite3"
+        first = SQLiteCacheStorage(db_path, shared=True)
+        second = SQLiteCacheStorage(db_path, shared=True)
+        channel_id = "test-channel"
+
+        assert first.try_lease(channel_id, 0, 100, "first", ttl_ms=60_000)
+        assert not second.try_lease(channel_id, 50, 150, "second", ttl_ms=60_000)
+        assert second.try_lease(channel_id, 100, 150, "second", ttl_ms=60_000)
+
+        first.release_lease(channel_id, 0, 100, "first")
+        assert second.try_lease(channel_id, 50, 100, "second", ttl_ms=60_000)
+
+        # An expired lease no longer blocks other owners
+        assert first.try_lease("other-channel", 0, 100, "first", ttl_ms=0)
+        assert second.try_lease("other-channel", 0, 100, "second", ttl_ms=60_000)
+
+    def test_messages_past_the_retention_are_pruned_on_store(self, tmp_path):
+        """Test that a store drops old messages and trims the covered ranges."""
+        api = MockApi(
+            [
+                {
+                    "username": "TestUser1",
+                    "message": "Old message",
+                    "images": [],
+                    "createdAt": "2025-04-01T10:00:00.000Z",
+                },
+                {
+                    "username": "TestUser2",
+                    "message": "Recent message",
+                    "images": [],
+                    "createdAt": "2025-04-20T10:00:00.000Z",
+                },
+            ]
+        )
+        now = {"ms": parse_epoch_ms("2025-04-05T00:00:00.000Z")}
+        storage = SQLiteCacheStorage(
+            tmp_path / "cache.sqlite3",
+            retention_days=10,
+            clock=lambda: now["ms"] / 1000,
+        )
+        channel_id = "test-channel"
+        cache = api.cache(storage=storage)
+        asyncio.run(
+            cache.aload(
+                channel_id, "2025-03-30T00:00:00.000Z", "2025-04-05T00:00:00.000Z"
+            )
+        )
+
+        # Three weeks later the first range is older than the retention
+        now["ms"] = parse_epoch_ms("2025-04-26T00:00:00.000Z")
+        asyncio.run(
+            cache.aload(
+                channel_id, "2025-04-10T00:00:00.000Z", "2025-04-21T00:00:00.000Z"
+            )
+        )
+
+        everything = (
+            parse_epoch_ms("2025-03-01T00:00:00.000Z"),
+            parse_epoch_ms("2025-05-01T00:00:00.000Z"),
+        )
+        assert [
+            msg.message for msg in storage.load_messages(channel_id, *everything)
+        ] == ["Recent message"]
+        assert storage.find_covered(channel_id, *everything) == [
+            (
+                parse_epoch_ms("2025-04-16T00:00:00.000Z"),
+                parse_epoch_ms("2025-04-21T00:00:00.000Z"),
+            )
+        ]
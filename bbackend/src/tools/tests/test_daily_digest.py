@@ -0,0 +1,128 @@
+import asyncio
+from dataclasses import replace
+from datetime import date, datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.config_loader import load_config
+from src.dtos import Message
+from src.tools.cache_storage import SQLiteCacheStorage
+from src.tools.daily_digest import DailyDigests
+from src.tools.summary_cache import SummaryCache
+
+
+def _digests(cache) -> DailyDigests:
+    now = datetime(2025, 4, 26, 9, 0, tzinfo=timezone.utc)
+    config = replace(load_config(), summarizer_model="test-model")
+    return DailyDigests(
+        cache,
+        SummaryCache(ttl_seconds=60, max_entries=10),
+        config,
+        channels=lambda: ["test-channel"],
+        clock=lambda: now,
+    )
+
+
+class TestDailyDigests:
+    """Test cases for the precomputed daily digests."""
+
+    def test_only_plain_questions_about_closed_days_match(self):
+        """Test that the fast path is limited to simple day-scoped questions."""
+        digests = _digests(MagicMock())
+
+        assert digests.question_day("What happened yesterday?") == date(2025, 4, 25)
+        assert digests.question_day("podsumuj wczoraj") == date(2025, 4, 25)
+        assert digests.question_day("Summarize 2025-04-20") == date(2025, 4, 20)
+        assert digests.question_day("What happened today?") is None
+        assert digests.question_day("Summarize 2025-04-26") is None
+        assert digests.question_day("What did Alice say yesterday?") is None
+
+    def test_questions_after_the_bot_mention_match(self):
+        """Test that the bot name or mention the frontend leaves in front is ignored."""
+        digests = _digests(MagicMock())
+
+        assert digests.question_day("Podsumowywator what happened yesterday?") == date(
+            2025, 4, 25
+        )
+        assert digests.question_day("<@1234> podsumuj wczoraj") == date(2025, 4, 25)
+        assert digests.question_day("Podsumowywator, what did Alice say?") is None
+
+    def test_days_are_utc_days_whatever_the_local_zone(self):
+        """Test that yesterday is the last closed UTC day, also just after local midnight."""
+        local = timezone(timedelta(hours=2))
+        digests = _digests(MagicMock())
+        digests._now = lambda: datetime(2025, 4, 26, 0, 30, tzinfo=local)
+
+        # It is still 2025-04-25 in UTC, so that day is open
+        assert digests.question_day("Summarize yesterday") == date(2025, 4, 24)
+        assert digests.question_day("Summarize 2025-04-25") is None
+
+    def test_questions_are_answered_from_the_digest_of_unchanged_days(self):
+        """Test that a digest made in the background answers until the day changes."""
+        messages = [
+            Message(
+                username="User1",
+                message="Hello",
+                images=[],
+                createdAt="2025-04-25T10:00:00.000Z",
+            )
+        ]
+        cache = MagicMock()
+        cache.aload = AsyncMock(return_value=messages)
+        digests = _digests(cache)
+        run = AsyncMock(return_value=SimpleNamespace(final_output="daily digest"))
+
+        assert (
+            asyncio.run(digests.answer("test-channel", "Summarize yesterday")) is None
+        )
+
+        with patch("src.tools.summarizer.Runner.run", run):
+            assert asyncio.run(digests.run_once()) == 1
+        cache.aload.assert_awaited_with(
+            "test-channel", "2025-04-25T00:00:00.000Z", "2025-04-26T00:00:00.000Z"
+        )
+
+        answer = asyncio.run(digests.answer("test-channel", "What happened yesterday?"))
+        assert answer == "daily digest"
+        assert run.await_count == 1
+
+        messages.append(
+            Message(
+                username="User2",
+                message="Late edit",
+                images=[],
+                createdAt="2025-04-25T23:00:00.000Z",
+            )
+        )
+        assert (
+            asyncio.run(digests.answer("test-channel", "Summarize yesterday")) is None
+        )
+
+    def test_a_single_worker_digests_with_a_shared_storage(self, tmp_path):
+        """Test that workers sharing the storage leave digesting to the lease holder."""
+        messages = [
+            Message(
+                username="User1",
+                message="Hello",
+                images=[],
+                createdAt="2025-04-25T10:00:00.000Z",
+            )
+        ]
+        workers = []
+        for _ in range(2):
+            cache = MagicMock()
+            cache.storage = SQLiteCacheStorage(tmp_path / "cache.sqlite3", shared=True)
+            cache.aload = AsyncMock(return_value=messages)
+            workers.append(_digests(cache))
+        first, second = workers
+        run = AsyncMock(return_value=SimpleNamespace(final_output="daily digest"))
+
+        with patch("src.tools.summarizer.Runner.run", run):
+            assert asyncio.run(first.run_once()) == 1
+            assert asyncio.run(second.run_once()) == 0
+            second.cache.aload.assert_not_called()
+
+            # Once the holder stops renewing, its lease expires and another takes over
+            first.interval_seconds = 0
+            asyncio.run(first.run_once())
+            assert asyncio.run(second.run_once()) == 1
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from src.tools.json_stream import JsonArrayParser
+
+
+class TestJsonArrayParser:
+    """Test cases for the incremental JSON array parser."""
+
+    def test_items_are_returned_as_soon_as_complete(self):
+        """Test that items split across chunks are returned once fully received."""
+        items = [
+            {"username": "User1", "message": "Hello, [world]!", "images": []},
+            {"username": "User2", "message": 'Quote " and }', "images": [{"url": "u"}]},
+        ]
+        body = json.dumps(items)
+        parser = JsonArrayParser()
+
+        parsed = []
+        for i in range(0, len(body), 7):
+            parsed.extend(parser.feed(body[i : i + 7]))
+        parser.close()
+
+        assert parsed == items
+
+    def test_empty_array(self):
+        """Test that an empty array yields no items."""
+        parser = JsonArrayParser()
+
+        assert parser.feed(" [ ") == []
+        assert parser.feed("]\n") == []
+        parser.close()
+
+    def test_truncated_array_is_rejected(self):
+        """Test that a body cut in the middle of the array raises on close."""
+        parser = JsonArrayParser()
+
+        assert parser.feed('[{"message": "complete"}, {"message": "cut') == [
+            {"message": "complete"}
+        ]
+        with pytest.raises(ValueError):
+            parser.close()
@@ -0,0 +1,145 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.dtos import Message
+from src.memory import BoundedStore, MessageHandle, MessageMemory, ThreadHistory
+
+
+class TestMessageMemory:
+    """Test cases for the bounded MessageMemory."""
+
+    def test_entries_expire_after_ttl(self):
+        """Test that entries not used within the TTL are dropped."""
+        store = BoundedStore(ttl_seconds=10, max_entries=10)
+        with patch("time.monotonic", return_value=100):
+            store.put("old", 1)
+        with patch("time.monotonic", return_value=105):
+            store.put("new", 2)
+            assert store.get("old") == 1
+
+        # Reading "old" at 105 renewed it, "new" was last used at 105 as well
+        with patch("time.monotonic", return_value=114):
+            assert store.get("new") == 2
+        with patch("time.monotonic", return_value=124.5):
+            with pytest.raises(KeyError):
+                store.get("old")
+            assert len(store) == 0
+
+    def test_least_recently_used_entries_are_dropped(self):
+        """Test that the store never holds more than max_entries."""
+        store = BoundedStore(ttl_seconds=60, max_entries=2)
+        store.put("a", 1)
+        store.put("b", 2)
+        store.get("a")
+        store.put("c", 3)
+
+        assert "a" in store
+        assert "b" not in store
+        assert "c" in store
+
+    def test_handles_resolve_through_the_cache_and_are_freed_with_the_scope(self):
+        """Test that stored handles load from the cache and live only within their scope."""
+        messages = [
+            Message(
+                username="User1",
+                message="Hello",
+                images=[],
+                createdAt="2025-04-01T10:00:00.000Z",
+            )
+        ]
+        loader = AsyncMock(return_value=messages)
+
+        with MessageMemory.scope() as memory:
+            messages_uuid = MessageMemory.store_messages(
+                MessageHandle("test-channel", "2025-04-01", "2025-04-02", loader=loader)
+            )
+            assert asyncio.run(MessageMemory.get_messages(messages_uuid)) == messages
+            loader.assert_awaited_once_with("test-channel", "2025-04-01", "2025-04-02")
+
+        assert len(memory.messages) == 0
+        with pytest.raises(RuntimeError):
+            MessageMemory.get_thread("test-thread")
+
+    def test_concurrent_requests_are_isolated(self):
+        """Test that tasks of concurrent scopes only see their own entries."""
+
+        async def request(thread_id: str, username: str) -> list[str]:
+            with MessageMemory.scope():
+                MessageMemory.store_thread(
+                    thread_id,
+                    [
+                        Message(
+                            username=username,
+                            message="Hi",
+                            images=[],
+                            createdAt="2025-04-01T10:00:00.000Z",
+                        )
+                    ],
+                )
+                await asyncio.sleep(0.01)
+
+                # Tools run in tasks started by the agent, which inherit the scope
+                async def tool() -> list[str]:
+                    return [msg.username for msg in MessageMemory.get_thread("thread")]
+
+                return await asyncio.create_task(tool())
+
+        async def run():
+            return await asyncio.gather(
+                request("thread", "User1"), request("thread", "User2")
+            )
+
+        assert asyncio.run(run()) == [["User1"], ["User2"]]
+
+    def test_thread_history_appends_only_new_messages(self):
+        """Test that a resent thread only yields the messages not seen before."""
+
+        def turn(username: str, message: str, created_at: str) -> Message:
+            return Message(
+                username=username, message=message, images=[], createdAt=created_at
+            )
+
+        first = turn("User1", "What happened yesterday?", "2025-04-26T10:00:00Z")
+        answer = turn("Assistant", "Nothing much", "2025-04-26T10:00:05Z")
+        follow_up = turn("User1", "And today?", "2025-04-26T10:01:00Z")
+        history = ThreadHistory(ttl_seconds=60, max_threads=10)
+
+        update = history.append("thread", [first])
+        assert update.new_messages == [first]
+        assert update.earlier_messages == []
+
+        update = history.append("thread", [first, answer, follow_up])
+        assert update.new_messages == [answer, follow_up]
+        assert update.earlier_messages == [first]
+        assert update.history == [first, answer, follow_up]
+
+        # Sending only the delta works the same, a plain resend repeats the last turn
+        update = history.append("thread", [follow_up])
+        assert update.new_messages == [follow_up]
+        assert update.earlier_messages == [first, answer]
+
+    def test_trimmed_messages_do_not_come_back_as_new(self):
+        """Test that resending a thread longer than the limit keeps the newest messages."""
+        messages = [
+            Message(
+                username="User1",
+                message=f"m{i}",
+                images=[],
+                createdAt=f"2025-04-26T10:0{i}:00Z",
+            )
+            for i in range(7)
+        ]
+        history = ThreadHistory(ttl_seconds=60, max_threads=10)
+
+        with patch("src.memory.THREAD_MAX_MESSAGES", 3):
+            update = history.append("thread", messages[:6])
+            assert update.history == messages[3:6]
+            assert update.new_messages == messages[3:6]
+            assert update.earlier_messages == []
+
+            update = history.append("thread", messages)
+            assert update.history == messages[4:7]
+            assert update.new_messages == [messages[6]]
+            assert update.earlier_messages == messages[4:6]
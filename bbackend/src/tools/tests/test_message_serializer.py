@@ -0,0 +1,61 @@
+from src.dtos import Image, Message
+from src.tools.message_serializer import estimate_tokens, serialize_messages
+
+
+def _message(username: str, text: str, created_at: str, images=None) -> Message:
+    return Message(
+        username=username,
+        message=text,
+        images=images or [],
+        createdAt=created_at,
+    )
+
+
+class TestMessageSerializer:
+    """Test cases for the compact message serialization."""
+
+    def test_messages_are_packed_compactly(self):
+        """Test day headers, merged turns, image lists and the URL legend."""
+        url = "https://docs.example.com/design/mockups"
+        messages = [
+            _message("John", f"See {url}", "2025-04-26T10:00:00.000Z"),
+            _message(
+                "John",
+                "",
+                "2025-04-26T10:01:00.000Z",
+                [Image(url="design1.jpg", extension="jpg")],
+            ),
+            _message("Sarah", f"{url} looks good", "2025-04-26T10:30:00.000Z"),
+            _message("John", "Thanks", "2025-04-27T08:00:00.000Z"),
+        ]
+
+        serialized = serialize_messages(messages)
+
+        assert serialized.text == (
+            "URLs:\n"
+            f"[U1] {url}\n"
+            "## 2025-04-26\n"
+            "10:00 John: See [U1]\n"
+            "  [images: design1.jpg]\n"
+            "10:30 Sarah: [U1] looks good\n"
+            "## 2025-04-27\n"
+            "08:00 John: Thanks"
+        )
+        assert serialized.omitted == 0
+        assert serialized.tokens == estimate_tokens(serialized.text)
+
+    def test_budget_keeps_the_newest_messages(self):
+        """Test that the oldest messages are dropped and marked to fit the budget."""
+        messages = [
+            _message(f"User{i}", "x" * 40, f"2025-04-26T10:{i:02d}:00.000Z")
+            for i in range(10)
+        ]
+
+        serialized = serialize_messages(messages, max_tokens=50)
+
+        assert serialized.tokens <= 50
+        assert serialized.omitted > 0
+        assert serialized.text.startswith(
+            f"[{serialized.omitted} earlier messages omitted]\n"
+        )
+        assert serialized.text.endswith("10:09 User9: " + "x" * 40)
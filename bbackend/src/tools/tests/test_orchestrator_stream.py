@@ -0,0 +1,88 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from src.agent import OrchestratorAgent
+from src.dtos import Message, SummaryRequest
+from src.memory import MessageHandle, MessageMemory, ThreadUpdate
+
+
+class TestOrchestratorStream:
+    """Test cases for the streamed orchestrator run."""
+
+    def test_stream_events_are_mapped_to_progress_events(self):
+        """Test that tool calls, loaded messages and text deltas become events."""
+        with patch("src.agent.get_orchestrator_tools", return_value=[]):
+            agent = OrchestratorAgent(MagicMock())
+        message = Message(
+            username="User1",
+            message="What happened?",
+            images=[],
+            createdAt="2025-04-26T10:00:00.000Z",
+        )
+        request = SummaryRequest(
+            messages=[message], channelId="test-channel", threadId="thread"
+        )
+
+        async def run():
+            with MessageMemory.scope():
+                messages_uuid = MessageMemory.store_messages(
+                    MessageHandle(
+                        "test-channel", "2025-04-25", "2025-04-26", loader=AsyncMock()
+                    )
+                )
+                stream_events = [
+                    SimpleNamespace(
+                        type="run_item_stream_event",
+                        name="tool_called",
+                        item=SimpleNamespace(
+                            raw_item=SimpleNamespace(
+                                name="load_messages", call_id="call-1", arguments="{}"
+                            )
+                        ),
+                    ),
+                    SimpleNamespace(
+                        type="run_item_stream_event",
+                        name="tool_output",
+                        item=SimpleNamespace(
+                            raw_item={"call_id": "call-1"}, output=messages_uuid
+                        ),
+                    ),
+                    SimpleNamespace(
+                        type="raw_response_event",
+                        data=SimpleNamespace(
+                            type="response.output_text.delta", delta="Nothing"
+                        ),
+                    ),
+                ]
+
+                async def events():
+                    for event in stream_events:
+                        yield event
+
+                result = SimpleNamespace(
+                    stream_events=events, final_output="Nothing much"
+                )
+                with patch("src.agent.Runner.run_streamed", return_value=result):
+                    return [
+                        event
+                        async for event in agent.stream_summary(
+                            request,
+                            ThreadUpdate(history=[message], new_messages=[message]),
+                        )
+                    ]
+
+        assert asyncio.run(run()) == [
+            ("tool_started", {"tool": "load_messages", "arguments": "{}"}),
+            ("tool_finished", {"tool": "load_messages"}),
+            (
+                "messages_loaded",
+                {
+                    "channel_id": "test-channel",
+                    "start_date": "2025-04-25",
+                    "end_date": "2025-04-26",
+                },
+            ),
+            ("delta", {"text": "Nothing"}),
+            ("final", {"message": "Nothing much"}),
+        ]
@@ -0,0 +1,73 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+from src.tools.prefetch_scheduler import PrefetchScheduler
+
+
+class TestPrefetchScheduler:
+    """Test cases for the PrefetchScheduler class."""
+
+    def test_hot_channels_decay_over_time(self):
+        """Test that channels are ranked by request counts halving every half-life."""
+        now = {"time": datetime(2025, 4, 26, 12, 0, tzinfo=timezone.utc)}
+        scheduler = PrefetchScheduler(
+            MagicMock(),
+            max_channels=2,
+            popularity_half_life_seconds=3600,
+            clock=lambda: now["time"],
+        )
+        for _ in range(4):
+            scheduler.record_request("busy-yesterday")
+
+        now["time"] += timedelta(hours=3)
+        for _ in range(2):
+            scheduler.record_request("busy-now")
+        scheduler.record_request("quiet")
+
+        # 4 requests three half-lives ago count as 0.5
+        assert scheduler.hot_channels() == ["busy-now", "quiet"]
+
+    def test_quiet_hours_wrap_around_midnight(self):
+        """Test that quiet hours from 22 to 6 include the night only."""
+        now = {"time": datetime(2025, 4, 26, 23, 30, tzinfo=timezone.utc)}
+        scheduler = PrefetchScheduler(
+            MagicMock(), quiet_hours=(22, 6), clock=lambda: now["time"]
+        )
+        assert scheduler.in_quiet_hours()
+
+        now["time"] = now["time"].replace(hour=5)
+        assert scheduler.in_quiet_hours()
+
+        now["time"] = now["time"].replace(hour=6)
+        assert not scheduler.in_quiet_hours()
+
+    def test_run_once_loads_windows_of_hot_channels(self):
+        """Test that today, yesterday and the last week are loaded for hot channels."""
+        cache = MagicMock()
+        cache.aload = AsyncMock(return_value=[])
+        now = datetime(2025, 4, 26, 14, 30, tzinfo=timezone.utc)
+        scheduler = PrefetchScheduler(
+            cache, max_channels=1, lookback_days=7, clock=lambda: now
+        )
+        scheduler.record_request("test-channel")
+
+        loaded = asyncio.run(scheduler.run_once())
+
+        assert loaded == 3
+        assert [call.args for call in cache.aload.call_args_list] == [
+            ("test-channel", "2025-04-26T00:00:00.000Z", "2025-04-26T14:30:00.000Z"),
+            ("test-channel", "2025-04-25T00:00:00.000Z", "2025-04-26T00:00:00.000Z"),
+            ("test-channel", "2025-04-19T00:00:00.000Z", "2025-04-26T14:30:00.000Z"),
+        ]
+
+    def test_run_once_skips_quiet_hours(self):
+        """Test that nothing is loaded during quiet hours."""
+        cache = MagicMock()
+        cache.aload = AsyncMock(return_value=[])
+        now = datetime(2025, 4, 26, 3, 0, tzinfo=timezone.utc)
+        scheduler = PrefetchScheduler(cache, quiet_hours=(1, 6), clock=lambda: now)
+        scheduler.record_request("test-channel")
+
+        assert asyncio.run(scheduler.run_once()) == 0
+        cache.aload.assert_not_called()
@@ -1,51 +1,46 @@
-import pytest
-from unittest.mock import patch, MagicMock, call
-from datetime import datetime, timedelta
+import asyncio
+from datetime import datetime, timedelta, timezone
 
 from src.tools.read_through_cache import ReadThroughCache
+from .test_read_through_cache_async import MockApi
+
+
+def _message(username: str, message: str, created_at: str) -> dict:
+    return {
+        "username": username,
+        "message": message,
+        "images": [],
+        "createdAt": created_at,
+    }
+
+
+def _load(cache: ReadThroughCache, channel_id: str, start_date: str, end_date: str):
+    """Run a single load to completion, as one request would."""
+    return asyncio.run(cache.aload(channel_id, start_date, end_date))
 
 
 class TestReadThroughCache:
     """Test cases for the ReadThroughCache class."""
 
-    @patch("requests.get")
-    def test_load_calls_api(self, mock_get):
-        """Test that load method calls the API with correct parameters."""
-        # Setup mock response
-        mock_response = MagicMock()
-        mock_response.json.return_value = [
-            {
-                "username": "TestUser1",
-                "message": "Test message 1",
-                "images": [],
-                "createdAt": "2023-01-01T10:00:00.000Z",
-            },
-            {
-                "username": "TestUser2",
-                "message": "Test message 2",
-                "images": [],
-                "createdAt": "2023-01-01T11:00:00.000Z",
-            },
-        ]
-        mock_get.return_value = mock_response
-
-        # Create cache and call load
-        cache = ReadThroughCache()
+    def test_load_calls_api(self):
+        """Test that a load calls the API with correct parameters."""
+        api = MockApi(
+            [
+                _message("TestUser1", "Test message 1", "2023-01-01T10:00:00.000Z"),
+                _message("TestUser2", "Test message 2", "2023-01-01T11:00:00.000Z"),
+            ]
+        )
+        cache = api.cache()
         channel_id = "test-channel"
         start_date = "2023-01-01T00:00:00.000Z"
         end_date = "2023-01-10T00:00:00.000Z"
 
-        messages = cache.load(channel_id, start_date, end_date)
+        messages = _load(cache, channel_id, start_date, end_date)
 
-        # Verify the API was called with correct parameters
-        mock_get.assert_called_once()
-        # Extract the call arguments
-        args, kwargs = mock_get.call_args
-
-        # Check the URL params contain the expected values
-        assert kwargs["params"]["channelId"] == channel_id
-        assert kwargs["params"]["startDate"] == start_date
-        assert kwargs["params"]["endDate"] == end_date
+        # Verify the API was called once with the requested range
+        assert api.calls == [
+            {"channelId": channel_id, "startDate": start_date, "endDate": end_date}
+        ]
 
         # Verify response was processed correctly
         assert len(messages) == 2
@@ -54,216 +49,128 @@ class TestReadThroughCache:
         assert messages[1].username == "TestUser2"
         assert messages[1].message == "Test message 2"
 
-    @patch("requests.get")
-    def test_no_api_call_for_cached_data(self, mock_get):
+    def test_no_api_call_for_cached_data(self):
         """Test that API is not called a second time for the same parameters."""
-        # Setup mock response
-        mock_response = MagicMock()
-        mock_response.json.return_value = [
-            {
-                "username": "TestUser1",
-                "message": "Test message 1",
-                "images": [],
-                "createdAt": "2023-01-01T10:00:00.000Z",
-            },
-            {
-                "username": "TestUser2",
-                "message": "Test message 2",
-                "images": [],
-                "createdAt": "2023-01-01T11:00:00.000Z",
-            },
-        ]
-        mock_get.return_value = mock_response
-
-        # Create cache
-        cache = ReadThroughCache()
+        api = MockApi(
+            [
+                _message("TestUser1", "Test message 1", "2023-01-01T10:00:00.000Z"),
+                _message("TestUser2", "Test message 2", "2023-01-01T11:00:00.000Z"),
+            ]
+        )
+        cache = api.cache()
         channel_id = "test-channel"
         start_date = "2023-01-01T00:00:00.000Z"
         end_date = "2023-01-10T00:00:00.000Z"
 
         # First call should hit the API
-        first_messages = cache.load(channel_id, start_date, end_date)
+        first_messages = _load(cache, channel_id, start_date, end_date)
 
         # Second call with same parameters should use cache
-        second_messages = cache.load(channel_id, start_date, end_date)
+        second_messages = _load(cache, channel_id, start_date, end_date)
 
         # Verify the API was called exactly once
-        mock_get.assert_called_once()
+        assert len(api.calls) == 1
 
         # Verify both responses have the same data
-        assert len(first_messages) == len(second_messages)
-        assert first_messages[0].username == second_messages[0].username
-        assert first_messages[0].message == second_messages[0].message
-        assert first_messages[1].username == second_messages[1].username
-        assert first_messages[1].message == second_messages[1].message
-
-    @patch("requests.get")
-    def test_partial_cache_hit(self, mock_get):
-        """Test that only missing date ranges are requested when there's a partial overlap."""
-        # Setup initial cache with data for 2025-04-03 to 2025-04-06
-        mock_response1 = MagicMock()
-        mock_response1.json.return_value = [
-            {
-                "username": "User1",
-                "message": "Cached message 1",
-                "images": [],
-                "createdAt": "2025-04-03T10:00:00.000Z",
-            },
-            {
-                "username": "User2",
-                "message": "Cached message 2",
-                "images": [],
-                "createdAt": "2025-04-03T11:00:00.000Z",
-            },
-        ]
-
-        # Setup response for missing range (2025-04-01 to 2025-04-03)
-        mock_response2 = MagicMock()
-        mock_response2.json.return_value = [
-            {
-                "username": "User3",
-                "message": "New message 1",
-                "images": [],
-                "createdAt": "2025-04-01T10:00:00.000Z",
-            },
-            {
-                "username": "User4",
-                "message": "New message 2",
-                "images": [],
-                "createdAt": "2025-04-01T11:00:00.000Z",
-            },
+        assert [(msg.username, msg.message) for msg in first_messages] == [
+            (msg.username, msg.message) for msg in second_messages
         ]
 
-        # The mock will return different responses for different calls
-        mock_get.side_effect = [mock_response1, mock_response2]
-
-        # Create cache and populate with initial data
-        cache = ReadThroughCache()
+    def test_partial_cache_hit(self):
+        """Test that only missing date ranges are requested when there's a partial overlap."""
+        api = MockApi(
+            [
+                _message("User3", "New message 1", "2025-04-01T10:00:00.000Z"),
+                _message("User4", "New message 2", "2025-04-01T11:00:00.000Z"),
+                _message("User1", "Cached message 1", "2025-04-03T10:00:00.000Z"),
+                _message("User2", "Cached message 2", "2025-04-03T11:00:00.000Z"),
+            ]
+        )
+        cache = api.cache()
         channel_id = "test-channel"
 
         # First, load data for 2025-04-03 to 2025-04-06
         cache_start = "2025-04-03T00:00:00.000Z"
         cache_end = "2025-04-06T00:00:00.000Z"
-        cache.load(channel_id, cache_start, cache_end)
-
-        # Reset the mock to clear the call history
-        mock_get.reset_mock()
+        _load(cache, channel_id, cache_start, cache_end)
 
         # Now request a range that partially overlaps (2025-04-01 to 2025-04-05)
         request_start = "2025-04-01T00:00:00.000Z"
         request_end = "2025-04-05T00:00:00.000Z"
-        messages = cache.load(channel_id, request_start, request_end)
-
-        # Verify API was called only for the missing range
-        mock_get.assert_called_once()
-        args, kwargs = mock_get.call_args
-
-        # The API should be called with the missing range parameters
-        assert kwargs["params"]["channelId"] == channel_id
-        assert kwargs["params"]["startDate"] == request_start
-        assert kwargs["params"]["endDate"] == cache_start
-
-        # Verify we got 4 messages (2 from cache + 2 from API)
-        assert len(messages) == 4
+        messages = _load(cache, channel_id, request_start, request_end)
 
-        # Check if the messages from both ranges are present
-        message_texts = [msg.message for msg in messages]
-        assert "New message 1" in message_texts
-        assert "New message 2" in message_texts
-        assert "Cached message 1" in message_texts
-        assert "Cached message 2" in message_texts
-
-    @patch("requests.get")
-    def test_cache_optimization(self, mock_get):
-        """Test that cache gets optimized by merging touching/overlapping ranges."""
-        # Setup responses for initial ranges
-        mock_response1 = MagicMock()
-        mock_response1.json.return_value = [
-            {
-                "username": "User1",
-                "message": "Range 1 message 1",
-                "images": [],
-                "createdAt": "2025-04-01T10:00:00.000Z",
-            },
-            {
-                "username": "User2",
-                "message": "Range 1 message 2",
-                "images": [],
-                "createdAt": "2025-04-01T11:00:00.000Z",
-            },
-        ]
-
-        mock_response2 = MagicMock()
-        mock_response2.json.return_value = [
-            {
-                "username": "User3",
-                "message": "Range 2 message 1",
-                "images": [],
-                "createdAt": "2025-04-06T10:00:00.000Z",
-            },
+        # The API should only be called for the missing range
+        assert api.calls[1:] == [
             {
-                "username": "User4",
-                "message": "Range 2 message 2",
-                "images": [],
-                "createdAt": "2025-04-06T11:00:00.000Z",
-            },
+                "channelId": channel_id,
+                "startDate": request_start,
+                "endDate": cache_start,
+            }
         ]
 
-        mock_response3 = MagicMock()
-        mock_response3.json.return_value = [
-            {
-                "username": "User5",
-                "message": "Overlapping message 1",
-                "images": [],
-                "createdAt": "2025-04-02T10:00:00.000Z",
-            },
-            {
-                "username": "User6",
-                "message": "Overlapping message 2",
-                "images": [],
-                "createdAt": "2025-04-02T11:00:00.000Z",
-            },
+        # Verify we got 4 messages (2 from cache + 2 from API)
+        assert [msg.message for msg in messages] == [
+            "New message 1",
+            "New message 2",
+            "Cached message 1",
+            "Cached message 2",
         ]
 
-        mock_get.side_effect = [mock_response1]
-
-        cache = ReadThroughCache()
+    def test_cache_optimization(self):
+        """Test that cache gets optimized by merging touching/overlapping ranges."""
+        api = MockApi(
+            [
+                _message("User1", "Range 1 message 1", "2025-04-01T10:00:00.000Z"),
+                _message("User2", "Range 1 message 2", "2025-04-01T11:00:00.000Z"),
+                _message("User5", "Overlapping message 1", "2025-04-04T10:00:00.000Z"),
+                _message("User6", "Overlapping message 2", "2025-04-04T11:00:00.000Z"),
+                _message("User3", "Range 2 message 1", "2025-04-06T10:00:00.000Z"),
+                _message("User4", "Range 2 message 2", "2025-04-06T11:00:00.000Z"),
+            ]
+        )
+        cache = api.cache()
         channel_id = "test-channel"
 
         # Load first range and verify count
-        first_messages = cache.load(
-            channel_id, "2025-04-01T00:00:00.000Z", "2025-04-03T00:00:00.000Z"
+        first_messages = _load(
+            cache, channel_id, "2025-04-01T00:00:00.000Z", "2025-04-03T00:00:00.000Z"
         )
         assert len(first_messages) == 2
         assert len(cache.cache[channel_id][0].messages) == 2  # Verify cache content
 
-        mock_get.side_effect = [mock_response2]
-
         # Load second range and verify count
-        second_messages = cache.load(
-            channel_id, "2025-04-06T00:00:00.000Z", "2025-04-10T00:00:00.000Z"
+        second_messages = _load(
+            cache, channel_id, "2025-04-06T00:00:00.000Z", "2025-04-10T00:00:00.000Z"
         )
         assert len(second_messages) == 2
-        assert len(cache.cache[channel_id]) == 2
+        assert [entry.range.start[:10] for entry in cache.cache[channel_id]] == [
+            "2025-04-01",
+            "2025-04-02",
+            "2025-04-06",
+            "2025-04-07",
+            "2025-04-08",
+            "2025-04-09",
+        ]
         assert (
             sum(len(entry.messages) for entry in cache.cache[channel_id]) == 4
         )  # Total cached messages
 
-        mock_get.side_effect = [mock_response3]
-
         # Load overlapping range and verify final merged state
-        third_messages = cache.load(
-            channel_id, "2025-04-02T00:00:00.000Z", "2025-04-07T00:00:00.000Z"
+        _load(cache, channel_id, "2025-04-02T00:00:00.000Z", "2025-04-07T00:00:00.000Z")
+        assert api.calls[-1]["startDate"] == "2025-04-03T00:00:00.000Z"
+        assert api.calls[-1]["endDate"] == "2025-04-06T00:00:00.000Z"
+
+        # Verify cache optimization resulted in one gapless range of day blocks
+        entries = list(cache.cache[channel_id])
+        assert len(entries) == 9
+        assert entries[0].range.start == "2025-04-01T00:00:00.000Z"
+        assert entries[-1].range.end == "2025-04-10T00:00:00.000Z"
+        assert all(
+            left.end_ts == right.start_ts for left, right in zip(entries, entries[1:])
         )
 
-        # Verify cache optimization resulted in a single range with all messages
-        assert len(cache.cache[channel_id]) == 1
-        cached_entry = cache.cache[channel_id][0]
-        assert cached_entry.range.start == "2025-04-01T00:00:00.000Z"
-        assert cached_entry.range.end == "2025-04-10T00:00:00.000Z"
-
         # Verify all messages are preserved in the merged range
-        all_messages = cached_entry.messages
+        all_messages = [msg for entry in entries for msg in entry.messages]
 
         # Verify message order (from oldest to newest based on range order)
         expected_order = [
@@ -282,3 +189,178 @@ class TestReadThroughCache:
             assert all_messages[i].message == exp_msg, (
                 f"Wrong message order at position {i}"
             )
+
+    def test_cache_hit_returns_only_requested_range(self):
+        """Test that a narrow range inside a cached range is sliced by timestamp."""
+        api = MockApi(
+            [
+                _message("User2", "Afternoon message", "2025-04-02T15:00:00.000Z"),
+                _message("User1", "Morning message", "2025-04-02T09:30:00.000Z"),
+                _message("User3", "Other day message", "2025-04-20T10:00:00.000Z"),
+            ]
+        )
+        cache = api.cache()
+        channel_id = "test-channel"
+        _load(cache, channel_id, "2025-04-01T00:00:00.000Z", "2025-05-01T00:00:00.000Z")
+
+        messages = _load(
+            cache, channel_id, "2025-04-02T09:00:00.000Z", "2025-04-02T16:00:00.000Z"
+        )
+
+        assert len(api.calls) == 1
+        assert [msg.message for msg in messages] == [
+            "Morning message",
+            "Afternoon message",
+        ]
+
+    def test_eviction_over_channel_budget(self):
+        """Test that least recently used ranges are evicted and fetched again."""
+        api = MockApi(
+            [
+                _message("User1", f"Message from {day}", f"{day}T10:00:00.000Z")
+                for day in ("2025-04-01", "2025-04-10")
+            ]
+        )
+        cache = api.cache(max_bytes_per_channel=1000)
+        channel_id = "test-channel"
+        _load(cache, channel_id, "2025-04-01T00:00:00.000Z", "2025-04-02T00:00:00.000Z")
+        entry_size = cache.size_bytes
+        cache.max_bytes_per_channel = entry_size + entry_size // 2
+
+        _load(cache, channel_id, "2025-04-10T00:00:00.000Z", "2025-04-11T00:00:00.000Z")
+
+        # The older range was evicted and only the newer one stays cached
+        assert len(cache.cache[channel_id]) == 1
+        assert cache.cache[channel_id][0].range.start == "2025-04-10T00:00:00.000Z"
+        assert cache.eviction_stats.evictions == 1
+        assert cache.eviction_stats.evicted_messages == 1
+        assert cache.eviction_stats.evicted_bytes == entry_size
+
+        # The evicted range is missing again and gets fetched from the API
+        messages = _load(
+            cache, channel_id, "2025-04-01T00:00:00.000Z", "2025-04-02T00:00:00.000Z"
+        )
+        assert len(api.calls) == 3
+        assert [msg.message for msg in messages] == ["Message from 2025-04-01"]
+
+    def test_contiguous_days_are_evicted_day_by_day(self):
+        """Test that consecutive days over the budget evict old days, not the channel."""
+        days = [f"2025-04-0{day}" for day in range(1, 8)]
+        api = MockApi(
+            [
+                _message(
+                    "User1", f"Message from {day} " + "x" * 500, f"{day}T10:00:00.000Z"
+                )
+                for day in days
+            ]
+        )
+        cache = api.cache(max_bytes_per_channel=1000)
+        channel_id = "test-channel"
+
+        def load_day(day: str):
+            return _load(
+                cache, channel_id, f"{day}T00:00:00.000Z", f"{day}T23:59:59.999Z"
+            )
+
+        load_day(days[0])
+        day_size = cache.size_bytes
+        cache.max_bytes_per_channel = 2 * day_size + day_size // 2
+
+        for day in days[1:]:
+            messages = load_day(day)
+            assert [msg.message[:23] for msg in messages] == [f"Message from {day}"]
+            # Only the oldest days go, the two newest stay cached
+            assert [entry.range.start[:10] for entry in cache.cache[channel_id]] == [
+                previous for previous in days if previous <= day
+            ][-2:]
+
+        # Repeating the last request is served from the cache
+        assert len(api.calls) == 7
+        load_day(days[-1])
+        assert len(api.calls) == 7
+        assert cache.eviction_stats.evictions == 5
+
+        # A request over the budget on its own keeps all of its days
+        messages = _load(
+            cache, channel_id, "2025-04-04T00:00:00.000Z", "2025-04-08T00:00:00.000Z"
+        )
+        assert len(messages) == 4
+        assert [entry.range.start[:10] for entry in cache.cache[channel_id]] == days[3:]
+
+    def test_live_edge_fetches_only_the_delta(self):
+        """Test that a range ending in the future is refreshed incrementally after the TTL."""
+        api = MockApi(
+            [
+                _message("User1", "Before the first fetch", "2025-04-26T13:00:00.000Z"),
+                _message("User2", "After the first fetch", "2025-04-26T14:01:00.000Z"),
+            ]
+        )
+        now = {"time": datetime(2025, 4, 26, 14, 0, 0, tzinfo=timezone.utc)}
+        cache = api.cache(
+            live_edge_ttl_seconds=60, clock=lambda: now["time"].timestamp()
+        )
+        channel_id = "test-channel"
+        start_date = "2025-04-26T12:00:00.000Z"
+        end_date = "2025-04-26T16:00:00.000Z"
+
+        _load(cache, channel_id, start_date, end_date)
+        assert api.calls[-1]["endDate"] == "2025-04-26T14:00:00.000Z"
+
+        # Within the TTL the live edge is served from the cache
+        now["time"] += timedelta(seconds=30)
+        messages = _load(cache, channel_id, start_date, end_date)
+        assert len(api.calls) == 1
+        assert [msg.message for msg in messages] == ["Before the first fetch"]
+
+        # After the TTL only the messages since the last fetch are requested
+        now["time"] += timedelta(seconds=90)
+        messages = _load(cache, channel_id, start_date, end_date)
+        assert len(api.calls) == 2
+        assert api.calls[-1]["startDate"] == "2025-04-26T14:00:00.000Z"
+        assert api.calls[-1]["endDate"] == "2025-04-26T14:02:00.000Z"
+        assert [msg.message for msg in messages] == [
+            "Before the first fetch",
+            "After the first fetch",
+        ]
+        assert len(cache.cache[channel_id]) == 1
+
+    def test_summary_and_pages_of_cached_messages(self):
+        """Test the cache summary and paging across cached ranges without fetching."""
+        api = MockApi(
+            [
+                _message(
+                    "User1",
+                    f"Message {hour} from {day}",
+                    f"{day}T{hour:02d}:00:00.000Z",
+                )
+                for day in ("2025-04-01", "2025-04-10")
+                for hour in range(3)
+            ]
+        )
+        cache = api.cache()
+        channel_id = "test-channel"
+        _load(cache, channel_id, "2025-04-01T00:00:00.000Z", "2025-04-02T00:00:00.000Z")
+        _load(cache, channel_id, "2025-04-10T00:00:00.000Z", "2025-04-11T00:00:00.000Z")
+
+        summary = cache.summary()
+        assert summary["message_count"] == 6
+        assert [
+            (r["start"], r["message_count"])
+            for r in summary["channels"][channel_id]["ranges"]
+        ] == [("2025-04-01T00:00:00.000Z", 3), ("2025-04-10T00:00:00.000Z", 3)]
+
+        total, page = cache.page(channel_id, offset=2, limit=2)
+        assert total == 6
+        assert [msg.message for msg in page] == [
+            "Message 2 from 2025-04-01",
+            "Message 0 from 2025-04-10",
+        ]
+
+        total, page = cache.page(
+            channel_id, "2025-04-10T01:00:00.000Z", "2025-04-11T00:00:00.000Z"
+        )
+        assert total == 2
+        assert len(api.calls) == 2
+
+        chunks = list(cache.iter_cached(channel_id))
+        assert sum(len(messages) for _, messages in chunks) == 6
@@ -0,0 +1,446 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+from loguru import logger
+from unittest.mock import AsyncMock, patch
+
+from src.config_loader import load_config
+from src.tools.cache_index import parse_epoch_ms
+from src.tools.cache_storage import SQLiteCacheStorage
+from src.tools.read_through_cache import PartialLoadError, ReadThroughCache
+from src.tools.upstream_client import UpstreamClient
+
+
+def _message(username: str, message: str, created_at: str) -> dict:
+    return {
+        "username": username,
+        "message": message,
+        "images": [],
+        "createdAt": created_at,
+    }
+
+
+class _BodyStream(httpx.AsyncByteStream):
+    def __init__(self, body: bytes):
+        self.body = body
+
+    async def __aiter__(self):
+        yield self.body
+
+
+class MockApi:
+    """
+    Messages API served through an httpx mock transport, recording every call.
+    Like the real API it answers with the messages created within the requested range.
+    """
+
+    def __init__(self, messages: list[dict], failing_starts: tuple[str, ...] = ()):
+        self.messages = messages
+        self.failing_starts = failing_starts
+        self.calls: list[dict] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.sent_bytes = 0
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        params = dict(request.url.params)
+        self.calls.append(params)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        # Give concurrent loads the chance to run while this fetch is in flight
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        if params["startDate"] in self.failing_starts:
+            return httpx.Response(500, json={"error": "Failed to fetch messages"})
+        body = json.dumps(
+            [
+                msg
+                for msg in self.messages
+                if params["startDate"] <= msg["createdAt"] < params["endDate"]
+            ]
+        ).encode()
+        self.sent_bytes += len(body)
+        # Streamed like a network response, so the received bytes are counted
+        return httpx.Response(
+            200,
+            headers={"content-type": "application/json"},
+            stream=_BodyStream(body),
+        )
+
+    def cache(self, **kwargs) -> ReadThroughCache:
+        client = UpstreamClient(
+            load_config(), transport=httpx.MockTransport(self.handler)
+        )
+        return ReadThroughCache(client=client, **kwargs)
+
+
+class TestReadThroughCacheAsync:
+    """Test cases for the async load path of ReadThroughCache."""
+
+    def test_aload_calls_api_and_caches(self):
+        """Test that aload fetches through the client once and then hits the cache."""
+        api = MockApi(
+            [
+                _message("TestUser1", "Test message 1", "2023-01-01T10:00:00.000Z"),
+                _message("TestUser2", "Test message 2", "2023-01-01T11:00:00.000Z"),
+            ]
+        )
+        cache = api.cache()
+        channel_id = "test-channel"
+        start_date = "2023-01-01T00:00:00.000Z"
+        end_date = "2023-01-10T00:00:00.000Z"
+
+        async def run():
+            first = await cache.aload(channel_id, start_date, end_date)
+            second = await cache.aload(channel_id, start_date, end_date)
+            await cache.client.aclose()
+            return first, second
+
+        first_messages, second_messages = asyncio.run(run())
+
+        assert api.calls == [
+            {"channelId": channel_id, "startDate": start_date, "endDate": end_date}
+        ]
+        assert [msg.message for msg in first_messages] == [
+            "Test message 1",
+            "Test message 2",
+        ]
+        assert [msg.message for msg in second_messages] == [
+            "Test message 1",
+            "Test message 2",
+        ]
+
+    def test_awarm_caches_the_range_without_building_messages(self):
+        """Test that awarm returns the count and leaves the DTOs to a later aload."""
+        api = MockApi(
+            [
+                _message("TestUser1", "Test message 1", "2023-01-01T10:00:00.000Z"),
+                _message("TestUser2", "Test message 2", "2023-01-01T11:00:00.000Z"),
+            ]
+        )
+        cache = api.cache()
+        channel_id = "test-channel"
+        start_date = "2023-01-01T00:00:00.000Z"
+        end_date = "2023-01-10T00:00:00.000Z"
+
+        async def run():
+            with patch("src.tools.read_through_cache.to_messages") as to_messages:
+                count = await cache.awarm(channel_id, start_date, end_date)
+                # A cache hit is counted without building them either
+                again = await cache.awarm(channel_id, start_date, end_date)
+            to_messages.assert_not_called()
+            messages = await cache.aload(channel_id, start_date, end_date)
+            await cache.client.aclose()
+            return count, again, messages
+
+        count, again, messages = asyncio.run(run())
+
+        assert (count, again) == (2, 2)
+        assert len(api.calls) == 1
+        assert [msg.message for msg in messages] == ["Test message 1", "Test message 2"]
+
+    def test_range_past_the_live_edge_returns_nothing(self):
+        """Test that a window after a fresh live edge fetch does not fetch or retry."""
+        api = MockApi([_message("User1", "Hello", "2025-04-26T11:59:00.000Z")])
+        now = {"time": datetime(2025, 4, 26, 12, 0, 0, tzinfo=timezone.utc)}
+        cache = api.cache(
+            live_edge_ttl_seconds=60, clock=lambda: now["time"].timestamp()
+        )
+
+        async def run():
+            await cache.aload(
+                "test-channel", "2025-04-26T11:00:00.000Z", "2025-04-26T13:00:00.000Z"
+            )
+            now["time"] += timedelta(seconds=20)
+            return await cache.aload(
+                "test-channel", "2025-04-26T12:00:10.000Z", "2025-04-26T12:00:30.000Z"
+            )
+
+        errors = []
+        sink = logger.add(errors.append, level="ERROR")
+        try:
+            assert asyncio.run(run()) == []
+        finally:
+            logger.remove(sink)
+        assert len(api.calls) == 1
+        assert errors == []
+
+    def test_concurrent_misses_share_one_fetch(self):
+        """Test that concurrent loads of overlapping ranges wait on one fetch."""
+        api = MockApi(
+            [
+                _message("TestUser1", "Morning", "2025-04-01T09:00:00.000Z"),
+                _message("TestUser2", "Evening", "2025-04-01T19:00:00.000Z"),
+            ]
+        )
+        cache = api.cache()
+        channel_id = "test-channel"
+
+        async def run():
+            results = await asyncio.gather(
+                cache.aload(
+                    channel_id, "2025-04-01T00:00:00.000Z", "2025-04-02T00:00:00.000Z"
+                ),
+                cache.aload(
+                    channel_id, "2025-04-01T00:00:00.000Z", "2025-04-02T00:00:00.000Z"
+                ),
+                cache.aload(
+                    channel_id, "2025-04-01T12:00:00.000Z", "2025-04-03T00:00:00.000Z"
+                ),
+            )
+            await cache.client.aclose()
+            return results
+
+        day, same_day, overlapping = asyncio.run(run())
+
+        # The third load only fetches the part the first one is not already fetching
+        assert api.calls == [
+            {
+                "channelId": channel_id,
+                "startDate": "2025-04-01T00:00:00.000Z",
+                "endDate": "2025-04-02T00:00:00.000Z",
+            },
+            {
+                "channelId": channel_id,
+                "startDate": "2025-04-02T00:00:00.000Z",
+                "endDate": "2025-04-03T00:00:00.000Z",
+            },
+        ]
+        assert [msg.message for msg in day] == ["Morning", "Evening"]
+        assert [msg.message for msg in same_day] == ["Morning", "Evening"]
+        assert [msg.message for msg in overlapping] == ["Evening"]
+        assert cache._inflight == {}
+
+    def _cache_with_two_gaps(self, api: MockApi, **kwargs) -> ReadThroughCache:
+        """Create a cache holding 2025-04-02 only, so 04-01 and 04-03 are missing."""
+        cache = api.cache(**kwargs)
+        cache._merge_touching_ranges(
+            "test-channel", "2025-04-02T00:00:00.000Z", "2025-04-03T00:00:00.000Z", []
+        )
+        return cache
+
+    def test_missing_ranges_are_fetched_in_parallel(self):
+        """Test that several gaps are fetched at once within the concurrency limit."""
+        api = MockApi([])
+        cache = self._cache_with_two_gaps(api, max_concurrent_fetches=2)
+
+        async def run():
+            await cache.aload(
+                "test-channel", "2025-04-01T00:00:00.000Z", "2025-04-04T00:00:00.000Z"
+            )
+            await cache.client.aclose()
+
+        asyncio.run(run())
+
+        assert len(api.calls) == 2
+        assert api.max_in_flight == 2
+        assert (
+            cache.cache["test-channel"].find_covering(
+                parse_epoch_ms("2025-04-01T00:00:00.000Z"),
+                parse_epoch_ms("2025-04-04T00:00:00.000Z"),
+            )
+            is not None
+        )
+
+    def test_concurrency_limit_is_respected(self):
+        """Test that no more fetches than the limit run at the same time."""
+        api = MockApi([])
+        cache = self._cache_with_two_gaps(api, max_concurrent_fetches=1)
+
+        async def run():
+            await cache.aload(
+                "test-channel", "2025-04-01T00:00:00.000Z", "2025-04-04T00:00:00.000Z"
+            )
+            await cache.client.aclose()
+
+        asyncio.run(run())
+
+        assert len(api.calls) == 2
+        assert api.max_in_flight == 1
+
+    def test_partial_failure_keeps_loaded_ranges(self):
+        """Test that a failed gap is reported while the successful one stays cached."""
+        api = MockApi(
+            [_message("TestUser1", "Third day", "2025-04-03T10:00:00.000Z")],
+            failing_starts=("2025-04-01T00:00:00.000Z",),
+        )
+        cache = self._cache_with_two_gaps(api)
+
+        async def run():
+            try:
+                await cache.aload(
+                    "test-channel",
+                    "2025-04-01T00:00:00.000Z",
+                    "2025-04-04T00:00:00.000Z",
+                )
+            finally:
+                await cache.client.aclose()
+
+        with pytest.raises(PartialLoadError) as exc_info:
+            asyncio.run(run())
+
+        error = exc_info.value
+        assert [(start, end) for start, end, _ in error.failures] == [
+            ("2025-04-01T00:00:00.000Z", "2025-04-02T00:00:00.000Z")
+        ]
+        assert [msg.message for msg in error.messages] == ["Third day"]
+        assert [entry.range.start for entry in cache.cache["test-channel"]] == [
+            "2025-04-02T00:00:00.000Z",
+            "2025-04-03T00:00:00.000Z",
+        ]
+        assert cache.cache["test-channel"][-1].range.end == "2025-04-04T00:00:00.000Z"
+
+    def test_concurrent_loads_keep_their_blocks_under_a_tight_budget(self):
+        """Test that loads evicting each other's blocks still return their messages."""
+        api = MockApi([_message("TestUser1", "Hello", "2025-04-01T10:00:00.000Z")])
+        cache = api.cache(max_bytes=1, max_concurrent_fetches=8)
+        channel_ids = [f"channel-{i}" for i in range(100)]
+
+        async def run():
+            results = await asyncio.gather(
+                *(
+                    cache.aload(
+                        channel_id,
+                        "2025-04-01T00:00:00.000Z",
+                        "2025-04-02T00:00:00.000Z",
+                    )
+                    for channel_id in channel_ids
+                )
+            )
+            await cache.client.aclose()
+            return results
+
+        results = asyncio.run(run())
+
+        assert all(
+            [msg.message for msg in messages] == ["Hello"] for messages in results
+        )
+        # Nothing was fetched twice, and only the last load's blocks outlive the budget
+        assert len(api.calls) == len(channel_ids)
+        assert cache._pinned == {}
+        assert len(cache.cache) == 1
+
+    def test_range_still_missing_after_all_attempts_raises(self):
+        """Test that a load never returns an empty list for a range it could not cover."""
+        api = MockApi([_message("TestUser1", "Hello", "2025-04-01T10:00:00.000Z")])
+        cache = api.cache()
+
+        async def run():
+            # Fills that complete without caching anything, like a cancelled joined fetch
+            with patch.object(cache, "_afill_coalesced", AsyncMock()) as fill:
+                try:
+                    await cache.aload(
+                        "test-channel",
+                        "2025-04-01T00:00:00.000Z",
+                        "2025-04-02T00:00:00.000Z",
+                    )
+                finally:
+                    await cache.client.aclose()
+            return fill
+
+        with pytest.raises(PartialLoadError) as exc_info:
+            asyncio.run(run())
+
+        assert [(start, end) for start, end, _ in exc_info.value.failures] == [
+            ("2025-04-01T00:00:00.000Z", "2025-04-02T00:00:00.000Z")
+        ]
+        assert exc_info.value.messages == []
+        assert cache._pinned == {}
+
+    def test_ndjson_response_is_streamed(self):
+        """Test that an NDJSON answer of the API is parsed line by line."""
+        messages = [
+            _message("TestUser1", "Test message 1", "2023-01-01T10:00:00.000Z"),
+            _message("TestUser2", "Test message 2", "2023-01-01T11:00:00.000Z"),
+        ]
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(
+                200,
+                content="\n".join(json.dumps(msg) for msg in messages) + "\n",
+                headers={"content-type": "application/x-ndjson"},
+            )
+
+        client = UpstreamClient(load_config(), transport=httpx.MockTransport(handler))
+
+        async def run():
+            try:
+                return await client.fetch_messages(
+                    "test-channel",
+                    "2023-01-01T00:00:00.000Z",
+                    "2023-01-02T00:00:00.000Z",
+                )
+            finally:
+                await client.aclose()
+
+        fetched = asyncio.run(run())
+
+        assert [msg.message for msg in fetched] == ["Test message 1", "Test message 2"]
+
+    def test_workers_sharing_storage_fetch_once(self, tmp_path):
+        """Test that caches of separate workers over a shared storage fetch a range once."""
+        api = MockApi([_message("TestUser1", "Shared", "2025-04-01T10:00:00.000Z")])
+        db_path = tmp_path / "cache.sqlite3"
+        workers = [
+            api.cache(storage=SQLiteCacheStorage(db_path, shared=True))
+            for _ in range(3)
+        ]
+        channel_id = "test-channel"
+
+        async def run():
+            results = await asyncio.gather(
+                *(
+                    cache.aload(
+                        channel_id,
+                        "2025-04-01T00:00:00.000Z",
+                        "2025-04-02T00:00:00.000Z",
+                    )
+                    for cache in workers
+                )
+            )
+            for cache in workers:
+                await cache.client.aclose()
+            return results
+
+        results = asyncio.run(run())
+
+        assert len(api.calls) == 1
+        assert all(
+            [msg.message for msg in messages] == ["Shared"] for messages in results
+        )
+
+    def test_large_json_body_is_streamed_and_validated(self):
+        """Test the streaming path for bodies over the bulk decode limit."""
+        messages = [
+            _message("TestUser1", "Test message 1", "2023-01-01T10:00:00.000Z"),
+            {
+                **_message("TestUser2", "Test message 2", "2023-01-01T11:00:00Z"),
+                "id": "2",
+            },
+        ]
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json=messages)
+
+        client = UpstreamClient(load_config(), transport=httpx.MockTransport(handler))
+
+        async def run():
+            try:
+                return await client.fetch_messages_sized(
+                    "test-channel",
+                    "2023-01-01T00:00:00.000Z",
+                    "2023-01-02T00:00:00.000Z",
+                )
+            finally:
+                await client.aclose()
+
+        with patch("src.tools.upstream_client.BULK_DECODE_MAX_BYTES", 0):
+            fetched, _ = asyncio.run(run())
+
+        assert [(msg.id, msg.created_at) for msg in fetched] == [
+            (None, "2023-01-01T10:00:00.000Z"),
+            ("2", "2023-01-01T11:00:00.000Z"),
+        ]
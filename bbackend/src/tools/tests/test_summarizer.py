@@ -0,0 +1,89 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from src.dtos import Message
+from src.tools.message_serializer import message_tokens
+from src.tools.summarizer import _chunk_messages, _is_wide_window, _map_reduce
+
+
+def _message(minute: int, text: str = "x" * 36) -> Message:
+    return Message(
+        username="User1",
+        message=text,
+        images=[],
+        createdAt=f"2025-04-26T{minute // 60:02d}:{minute % 60:02d}:00.000Z",
+    )
+
+
+class TestSummarizer:
+    """Test cases for map-reduce summarization of large windows."""
+
+    def test_chunks_end_at_conversation_gaps(self):
+        """Test that chunks are cut at a long pause once half of the budget is used."""
+        tokens = message_tokens(_message(0))
+        # Two conversations of three messages, an hour apart
+        messages = [_message(minute) for minute in (0, 1, 2, 62, 63, 64)]
+
+        chunks = _chunk_messages(messages, max_tokens=tokens * 4)
+
+        assert [len(chunk) for chunk in chunks] == [3, 3]
+
+        # Without a pause the chunk is cut right before the budget is exceeded
+        chunks = _chunk_messages(messages[:3], max_tokens=tokens * 2)
+        assert [len(chunk) for chunk in chunks] == [2, 1]
+
+    def test_tail_after_a_gap_is_flushed_when_the_message_does_not_fit(self):
+        """Test that no chunk exceeds the budget after a cut at a pause."""
+        sizes = [31, 26, 21, 21, 61]
+        # A long pause before the third message
+        messages = [_message(minute) for minute in (0, 1, 40, 41, 42)]
+
+        with patch("src.tools.summarizer.message_tokens", side_effect=sizes):
+            chunks = _chunk_messages(messages, max_tokens=100)
+
+        assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+
+    def test_map_reduce_summarizes_chunks_and_combines_them(self):
+        """Test that every chunk is summarized and the partial summaries reduced once."""
+        context = SimpleNamespace(
+            config=SimpleNamespace(
+                summarizer_model="test-model",
+                summarizer_chunk_tokens=100,
+                summarizer_max_concurrency=2,
+            )
+        )
+        messages = [_message(minute * 60, "x" * 300) for minute in range(4)]
+        run = AsyncMock(
+            side_effect=[SimpleNamespace(final_output=f"part {i}") for i in range(4)]
+            + [SimpleNamespace(final_output="answer")]
+        )
+
+        with patch("src.tools.summarizer.Runner.run", run):
+            result = asyncio.run(_map_reduce(context, messages, "What happened?"))
+
+        assert result == "answer"
+        assert run.await_count == 5
+        reduce_agent, reduce_input = run.await_args_list[-1].args
+        assert reduce_agent.tools == []
+        assert "part 0" in reduce_input and "part 3" in reduce_input
+        assert reduce_input.endswith("Query: What happened?")
+
+    def test_only_wide_windows_are_composed_from_daily_summaries(self):
+        """Test that a short window crossing midnight is not split into days."""
+        config = SimpleNamespace(summarizer_chunk_tokens=1000)
+
+        # The last two hours asked at 00:30 UTC
+        assert not _is_wide_window(
+            "2025-04-25T22:30:00.000Z", "2025-04-26T00:30:00.000Z", 200, config
+        )
+        # Over the chunk budget, or containing a whole day
+        assert _is_wide_window(
+            "2025-04-25T22:30:00.000Z", "2025-04-26T00:30:00.000Z", 1001, config
+        )
+        assert _is_wide_window(
+            "2025-04-24T12:00:00.000Z", "2025-04-26T00:00:00.000Z", 200, config
+        )
+        assert not _is_wide_window(
+            "2025-04-24T12:00:00.000Z", "2025-04-25T23:59:59.000Z", 200, config
+        )
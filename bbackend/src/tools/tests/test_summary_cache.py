@@ -0,0 +1,143 @@
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from src.dtos import Message
+from src.tools.summarizer import _summarize_by_day
+from src.tools.summary_cache import SummaryCache, SummaryKey
+
+
+def _message(created_at: str, text: str = "Hello") -> Message:
+    return Message(username="User1", message=text, images=[], createdAt=created_at)
+
+
+class TestSummaryCache:
+    """Test cases for memoized daily summaries."""
+
+    def test_concurrent_requests_share_one_summary(self):
+        """Test that a key is summarized once, also when requested concurrently."""
+        summary_cache = SummaryCache(ttl_seconds=60, max_entries=10)
+        key = SummaryKey("test-channel", "2025-04-26", "hash", "model", "v1")
+        calls = []
+
+        async def summarize() -> str:
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "summary"
+
+        async def run():
+            first = await asyncio.gather(
+                summary_cache.get_or_create(key, summarize),
+                summary_cache.get_or_create(key, summarize),
+            )
+            return first + [await summary_cache.get_or_create(key, summarize)]
+
+        assert asyncio.run(run()) == ["summary"] * 3
+        assert len(calls) == 1
+        assert summary_cache.to_dict()["misses"] == 1
+        assert summary_cache.to_dict()["hits"] == 2
+
+    def test_waiter_takes_over_when_the_owner_is_cancelled(self):
+        """Test that cancelling the summarizing request does not cancel its waiters."""
+        summary_cache = SummaryCache(ttl_seconds=60, max_entries=10)
+        key = SummaryKey("test-channel", "2025-04-26", "hash", "model", "v1")
+        started = []
+
+        async def summarize() -> str:
+            started.append(1)
+            await asyncio.sleep(0.05)
+            return f"summary {len(started)}"
+
+        async def run():
+            owner = asyncio.create_task(summary_cache.get_or_create(key, summarize))
+            await asyncio.sleep(0.01)
+            waiter = asyncio.create_task(summary_cache.get_or_create(key, summarize))
+            await asyncio.sleep(0.01)
+            owner.cancel()
+            result = await waiter
+            return owner.cancelled(), result
+
+        assert asyncio.run(run()) == (True, "summary 2")
+        assert summary_cache.get(key) == "summary 2"
+
+    def test_only_changed_days_are_summarized_again(self):
+        """Test that a wider window reuses the summaries of unchanged days."""
+        context = SimpleNamespace(
+            config=SimpleNamespace(
+                summarizer_model="test-model",
+                main_language="English",
+                summarizer_chunk_tokens=10000,
+                summarizer_max_concurrency=2,
+            )
+        )
+        summary_cache = SummaryCache(ttl_seconds=60, max_entries=10)
+        monday = _message("2025-04-21T10:00:00.000Z")
+        tuesday = _message("2025-04-22T10:00:00.000Z")
+        run = AsyncMock(
+            side_effect=lambda agent, input_text, context: SimpleNamespace(
+                final_output="answer" if agent.tools == [] else "daily summary"
+            )
+        )
+
+        with patch("src.tools.summarizer.Runner.run", run):
+            asyncio.run(
+                _summarize_by_day(
+                    context, summary_cache, "test-channel", [monday, tuesday], "Q"
+                )
+            )
+            # Two days and the final answer
+            assert run.await_count == 3
+
+            late_tuesday = _message("2025-04-22T18:00:00.000Z", "Later")
+            result = asyncio.run(
+                _summarize_by_day(
+                    context,
+                    summary_cache,
+                    "test-channel",
+                    [monday, tuesday, late_tuesday],
+                    "Q",
+                )
+            )
+
+        # Only the changed Tuesday and the final answer
+        assert run.await_count == 5
+        assert result == "answer"
+        assert summary_cache.hits == 1
+
+    def test_large_days_share_the_concurrency_limit(self):
+        """Test that map-reduce of several large days stays within one limit."""
+        context = SimpleNamespace(
+            config=SimpleNamespace(
+                summarizer_model="test-model",
+                main_language="English",
+                summarizer_chunk_tokens=100,
+                summarizer_max_concurrency=2,
+            )
+        )
+        # Three days of four messages, each message its own chunk
+        messages = [
+            _message(f"2025-04-2{day}T{hour:02d}:00:00.000Z", "x" * 300)
+            for day in range(1, 4)
+            for hour in range(4)
+        ]
+        running = {"now": 0, "max": 0}
+
+        async def run(agent, input_text, context):
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+            await asyncio.sleep(0.01)
+            running["now"] -= 1
+            return SimpleNamespace(final_output="summary")
+
+        with patch("src.tools.summarizer.Runner.run", run):
+            asyncio.run(
+                _summarize_by_day(
+                    context,
+                    SummaryCache(ttl_seconds=60, max_entries=10),
+                    "test-channel",
+                    messages,
+                    "Q",
+                )
+            )
+
+        assert running["max"] == 2
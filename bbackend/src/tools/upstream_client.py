@@ -0,0 +1,193 @@
+import sys
+from typing import Any, Optional
+import httpx
+from loguru import logger
+from pydantic import TypeAdapter, ValidationError
+from typing_extensions import NotRequired, TypedDict
+from ..config_loader import Config
+from ..dtos import Message
+from .cache_index import EMPTY_IMAGES, CachedMessage, parse_epoch_ms, to_messages
+from .json_stream import JsonArrayParser
+
+MESSAGES_PATH = "/matchenatinderze"
+NDJSON_CONTENT_TYPE = "application/x-ndjson"
+
+# Bodies up to this size are read whole and decoded in one call, larger ones stream
+BULK_DECODE_MAX_BYTES = 8 * 1024 * 1024
+# NDJSON lines validated together
+NDJSON_BATCH_LINES = 500
+
+
+class ImageRecord(TypedDict):
+    url: str
+    extension: str
+
+
+class MessageRecord(TypedDict):
+    """A message as sent by the messages API."""
+
+    id: NotRequired[Optional[str]]
+    username: str
+    message: str
+    images: list[ImageRecord]
+    # Parsed by parse_epoch_ms, pydantic's datetimes are slower to convert to epoch
+    createdAt: str
+
+
+# One validator for a whole list of messages, decoding JSON in pydantic-core when
+# given raw bytes. TypedDicts validate to plain dicts, far cheaper than models.
+MESSAGE_RECORDS = TypeAdapter(list[MessageRecord])
+
+
+def _to_cached(records: list[MessageRecord]) -> list[CachedMessage]:
+    return [
+        CachedMessage(
+            record.get("id"),
+            record["username"],
+            record["message"],
+            parse_epoch_ms(record["createdAt"]),
+            tuple(
+                (image["url"], sys.intern(image["extension"]))
+                for image in record["images"]
+            )
+            if record["images"]
+            else EMPTY_IMAGES,
+        )
+        for record in records
+    ]
+
+
+def decode_messages(data: bytes | str) -> list[CachedMessage]:
+    """Decode a raw JSON array of messages straight into cache records."""
+    try:
+        return _to_cached(MESSAGE_RECORDS.validate_json(data))
+    except ValidationError as e:
+        logger.error(f"Pydantic validation error: {e.errors()}")
+        raise
+
+
+def parse_messages(messages_data: list[dict[str, Any]]) -> list[CachedMessage]:
+    """Validate messages already decoded from JSON into cache records."""
+    try:
+        return _to_cached(MESSAGE_RECORDS.validate_python(messages_data))
+    except ValidationError as e:
+        logger.error(f"Pydantic validation error: {e.errors()}")
+        raise
+
+
+class UpstreamClient:
+    """
+    Async client of the messages API shared by all requests.
+
+    Connections are pooled and kept alive between calls, so concurrent summaries
+    reuse them instead of opening a new connection per fetch.
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        """
+        Args:
+            config: Provides the API URL, the per-call timeout and the pool limits
+            transport: Custom transport, used to mock the API in tests
+        """
+        self.config = config
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The pooled HTTP client, created on first use."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.config.api_base_url,
+                timeout=self.config.timeout_seconds,
+                limits=httpx.Limits(
+                    max_connections=self.config.upstream_max_connections,
+                    max_keepalive_connections=self.config.upstream_max_keepalive_connections,
+                ),
+                transport=self._transport,
+            )
+        return self._client
+
+    async def fetch_messages(
+        self,
+        channel_id: str,
+        start_date: str,
+        end_date: str,
+        timeout: Optional[float] = None,
+    ) -> list[Message]:
+        """Fetch the messages of a channel within a date range, see fetch_messages_sized."""
+        messages, _ = await self.fetch_messages_sized(
+            channel_id, start_date, end_date, timeout
+        )
+        return to_messages(messages)
+
+    async def fetch_messages_sized(
+        self,
+        channel_id: str,
+        start_date: str,
+        end_date: str,
+        timeout: Optional[float] = None,
+    ) -> tuple[list[CachedMessage], int]:
+        """
+        Fetch the messages of a channel within a date range as cache records, together
+        with the number of bytes received for them.
+
+        A JSON array body of known size up to BULK_DECODE_MAX_BYTES is decoded and
+        validated in a single call. Larger bodies and NDJSON are parsed while they
+        stream in and validated batch by batch, so the raw body and the decoded dicts
+        never exist as a whole.
+
+        Args:
+            channel_id: The Discord channel ID
+            start_date: Start date in ISO format (YYYY-MM-DDThh:mm:ss.sssZ)
+            end_date: End date in ISO format (YYYY-MM-DDThh:mm:ss.sssZ)
+            timeout: Timeout of this call in seconds, defaults to Config.timeout_seconds
+        """
+        params = {"channelId": channel_id, "startDate": start_date, "endDate": end_date}
+
+        messages: list[CachedMessage] = []
+        try:
+            async with self.client.stream(
+                "GET",
+                MESSAGES_PATH,
+                params=params,
+                headers={"Accept": f"{NDJSON_CONTENT_TYPE}, application/json"},
+                timeout=timeout if timeout is not None else self.config.timeout_seconds,
+            ) as response:
+                response.raise_for_status()
+                content_type = response.headers.get("content-type", "")
+                content_length = response.headers.get("content-length")
+                if content_type.startswith(NDJSON_CONTENT_TYPE):
+                    lines: list[str] = []
+                    async for line in response.aiter_lines():
+                        if line.strip():
+                            lines.append(line)
+                        if len(lines) >= NDJSON_BATCH_LINES:
+                            messages.extend(decode_messages(f"[{','.join(lines)}]"))
+                            lines.clear()
+                    if lines:
+                        messages.extend(decode_messages(f"[{','.join(lines)}]"))
+                elif (
+                    content_length is not None
+                    and int(content_length) <= BULK_DECODE_MAX_BYTES
+                ):
+                    messages = decode_messages(await response.aread())
+                else:
+                    parser = JsonArrayParser()
+                    async for chunk in response.aiter_text():
+                        messages.extend(parse_messages(parser.feed(chunk)))
+                    parser.close()
+            return messages, response.num_bytes_downloaded
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to load messages from API: {str(e)}")
+            raise
+
+    async def aclose(self) -> None:
+        """Close the pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None